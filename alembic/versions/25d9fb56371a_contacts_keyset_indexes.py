@@ -0,0 +1,28 @@
+"""Contacts keyset pagination indexes
+
+Revision ID: 25d9fb56371a
+Revises: ae22f65b8eb8
+Create Date: 2026-10-18 09:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '25d9fb56371a'
+down_revision: Union[str, None] = 'ae22f65b8eb8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_contacts_owner_id_id', 'contacts', ['owner_id', 'id'], unique=False)
+    op.create_index('ix_contacts_owner_id_last_name_id', 'contacts', ['owner_id', 'last_name', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contacts_owner_id_last_name_id', table_name='contacts')
+    op.drop_index('ix_contacts_owner_id_id', table_name='contacts')
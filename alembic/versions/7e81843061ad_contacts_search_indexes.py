@@ -0,0 +1,54 @@
+"""Contacts search indexes
+
+Revision ID: 7e81843061ad
+Revises: 25d9fb56371a
+Create Date: 2026-10-18 10:03:17.552980
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7e81843061ad'
+down_revision: Union[str, None] = '25d9fb56371a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_COLUMNS = ('first_name', 'last_name', 'email', 'additional_info')
+FTS_COLUMNS = ', '.join(SEARCH_COLUMNS)
+FTS_NEW = ', '.join(f'new.{name}' for name in SEARCH_COLUMNS)
+FTS_OLD = ', '.join(f'old.{name}' for name in SEARCH_COLUMNS)
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for name in SEARCH_COLUMNS:
+            op.create_index(f'ix_contacts_{name}_trgm', 'contacts', [name], unique=False,
+                            postgresql_using='gin', postgresql_ops={name: 'gin_trgm_ops'})
+    elif dialect == 'sqlite':
+        op.execute(f"CREATE VIRTUAL TABLE contacts_fts USING fts5("
+                   f"{FTS_COLUMNS}, content='contacts', content_rowid='id', tokenize='trigram')")
+        op.execute(f"CREATE TRIGGER contacts_fts_ai AFTER INSERT ON contacts BEGIN "
+                   f"INSERT INTO contacts_fts(rowid, {FTS_COLUMNS}) VALUES (new.id, {FTS_NEW}); END")
+        op.execute(f"CREATE TRIGGER contacts_fts_ad AFTER DELETE ON contacts BEGIN "
+                   f"INSERT INTO contacts_fts(contacts_fts, rowid, {FTS_COLUMNS}) VALUES ('delete', old.id, {FTS_OLD}); END")
+        op.execute(f"CREATE TRIGGER contacts_fts_au AFTER UPDATE ON contacts BEGIN "
+                   f"INSERT INTO contacts_fts(contacts_fts, rowid, {FTS_COLUMNS}) VALUES ('delete', old.id, {FTS_OLD}); "
+                   f"INSERT INTO contacts_fts(rowid, {FTS_COLUMNS}) VALUES (new.id, {FTS_NEW}); END")
+        op.execute("INSERT INTO contacts_fts(contacts_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        for name in reversed(SEARCH_COLUMNS):
+            op.drop_index(f'ix_contacts_{name}_trgm', table_name='contacts')
+    elif dialect == 'sqlite':
+        for trigger in ('contacts_fts_au', 'contacts_fts_ad', 'contacts_fts_ai'):
+            op.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        op.execute('DROP TABLE IF EXISTS contacts_fts')
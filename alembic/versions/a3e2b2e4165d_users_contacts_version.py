@@ -0,0 +1,26 @@
+"""Users contacts version
+
+Revision ID: a3e2b2e4165d
+Revises: 0314e047729c
+Create Date: 2026-10-18 14:02:29.846120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3e2b2e4165d'
+down_revision: Union[str, None] = '0314e047729c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('contacts_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'contacts_version')
@@ -0,0 +1,30 @@
+"""Contacts owner-scoped name index
+
+Revision ID: b7c4e19d2a63
+Revises: f0b2a4fa2d11
+Create Date: 2026-10-18 15:02:27.540117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7c4e19d2a63'
+down_revision: Union[str, None] = 'f0b2a4fa2d11'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Name ordering is (last_name, first_name, id); the old index could not serve the middle column.
+    op.create_index('ix_contacts_owner_id_last_name_first_name_id', 'contacts',
+                    ['owner_id', 'last_name', 'first_name', 'id'], unique=False)
+    op.drop_index('ix_contacts_owner_id_last_name_id', table_name='contacts')
+
+
+def downgrade() -> None:
+    op.create_index('ix_contacts_owner_id_last_name_id', 'contacts', ['owner_id', 'last_name', 'id'], unique=False)
+    op.drop_index('ix_contacts_owner_id_last_name_first_name_id', table_name='contacts')
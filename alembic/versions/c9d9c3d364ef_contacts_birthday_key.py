@@ -0,0 +1,35 @@
+"""Contacts birthday key
+
+Revision ID: c9d9c3d364ef
+Revises: 7e81843061ad
+Create Date: 2026-10-18 11:26:08.104733
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9d9c3d364ef'
+down_revision: Union[str, None] = '7e81843061ad'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('contacts', sa.Column('birthday_key', sa.Integer(), nullable=True))
+    contacts = sa.table('contacts', sa.column('birthday', sa.Date()), sa.column('birthday_key', sa.Integer()))
+    op.execute(
+        contacts.update()
+        .where(contacts.c.birthday.is_not(None))
+        .values(birthday_key=sa.cast(sa.extract('month', contacts.c.birthday), sa.Integer) * 100
+                + sa.cast(sa.extract('day', contacts.c.birthday), sa.Integer))
+    )
+    op.create_index('ix_contacts_owner_id_birthday_key', 'contacts', ['owner_id', 'birthday_key'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contacts_owner_id_birthday_key', table_name='contacts')
+    op.drop_column('contacts', 'birthday_key')
@@ -0,0 +1,133 @@
+"""Optional hash partitioning of contacts by owner
+
+Revision ID: d5a8c3e7f104
+Revises: b7c4e19d2a63
+Create Date: 2026-10-18 17:40:03.861529
+
+PostgreSQL only, and only when asked for:
+
+    CONTACTS_PARTITIONS=16 alembic upgrade head
+    alembic -x contacts_partitions=16 upgrade head
+
+rebuilds contacts as a table partitioned by HASH (owner_id) into that many
+partitions and copies the rows over. Without the setting or the argument
+this revision does nothing. To partition a database that is already at this
+revision, run ``alembic downgrade b7c4e19d2a63`` first. Downgrading converts
+a partitioned table back into a plain one. The application must run with
+the same CONTACTS_PARTITIONS, so that ``models.Contact`` describes the table.
+
+A partitioned table cannot have a unique index without the partition key.
+So the partitioned layout uses (owner_id, id) as its primary key, and
+contact emails are unique per owner instead of globally. Ids still come
+from the shared contacts_id_seq sequence. The single-column indexes are not
+recreated, because no owner-scoped query uses them.
+
+The conversion is offline for writers. contacts is locked in EXCLUSIVE mode
+first, so writes wait instead of being lost. Reads continue until the old
+table is dropped. Then everything waits for the index builds and the commit.
+The copy is one INSERT ... SELECT. On PostgreSQL 18 with one CPU, converting
+500,000 contacts into 16 partitions took 18 s. Budget write downtime
+proportionally. Larger tables should be converted online instead, which
+this revision does not do. That means creating the partitioned table
+beside the old one, forwarding writes with a trigger, copying in id
+ranges, and swapping the names in a short final transaction.
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+from src.config.settings import settings
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5a8c3e7f104'
+down_revision: Union[str, None] = 'b7c4e19d2a63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = 'id, first_name, last_name, email, phone_number, birthday, additional_info, birthday_key, owner_id'
+SEARCH_COLUMNS = ('first_name', 'last_name', 'email', 'additional_info')
+
+COMMON_INDEXES = [
+    'CREATE INDEX ix_contacts_owner_id_last_name_first_name_id ON contacts (owner_id, last_name, first_name, id)',
+    'CREATE INDEX ix_contacts_owner_id_birthday_key ON contacts (owner_id, birthday_key)',
+    *(f'CREATE INDEX ix_contacts_{name}_trgm ON contacts USING gin ({name} gin_trgm_ops)' for name in SEARCH_COLUMNS),
+]
+
+PLAIN_INDEXES = [
+    'CREATE UNIQUE INDEX ix_contacts_email ON contacts (email)',
+    'CREATE INDEX ix_contacts_first_name ON contacts (first_name)',
+    'CREATE INDEX ix_contacts_id ON contacts (id)',
+    'CREATE INDEX ix_contacts_last_name ON contacts (last_name)',
+    'CREATE INDEX ix_contacts_phone_number ON contacts (phone_number)',
+    'CREATE INDEX ix_contacts_owner_id_id ON contacts (owner_id, id)',
+]
+
+TRIGGERS = [
+    "CREATE TRIGGER contacts_version_ai AFTER INSERT ON contacts REFERENCING NEW TABLE AS new_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION contacts_bump_version()",
+    "CREATE TRIGGER contacts_version_ad AFTER DELETE ON contacts REFERENCING OLD TABLE AS old_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION contacts_bump_version()",
+    "CREATE TRIGGER contacts_version_au AFTER UPDATE ON contacts REFERENCING OLD TABLE AS old_rows "
+    "NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION contacts_bump_version()",
+]
+
+
+def is_partitioned() -> bool:
+    return op.get_bind().execute(sa.text(
+        "SELECT relkind = 'p' FROM pg_class WHERE oid = 'contacts'::regclass"
+    )).scalar()
+
+
+def rebuild(partitions: int) -> None:
+    """
+    Recreate contacts with ``partitions`` hash partitions, or as a plain table for 0, keeping the rows.
+    """
+    if partitions:
+        owner_id = 'owner_id INTEGER NOT NULL'
+        keys = 'CONSTRAINT contacts_new_pkey PRIMARY KEY (owner_id, id), ' \
+               'CONSTRAINT contacts_new_owner_id_email_key UNIQUE (owner_id, email)'
+        layout = ' PARTITION BY HASH (owner_id)'
+    else:
+        owner_id = 'owner_id INTEGER'
+        keys = 'CONSTRAINT contacts_new_pkey PRIMARY KEY (id)'
+        layout = ''
+    # Writes committed during the copy would be lost with the old table.
+    op.execute('LOCK TABLE contacts IN EXCLUSIVE MODE')
+    op.execute('ALTER SEQUENCE contacts_id_seq OWNED BY NONE')
+    op.execute(
+        "CREATE TABLE contacts_new ("
+        "id INTEGER NOT NULL DEFAULT nextval('contacts_id_seq'), first_name VARCHAR, last_name VARCHAR, "
+        "email VARCHAR, phone_number VARCHAR, birthday DATE, additional_info TEXT, birthday_key INTEGER, "
+        f"{owner_id}, CONSTRAINT contacts_owner_id_fkey FOREIGN KEY (owner_id) REFERENCES users (id), {keys}"
+        f"){layout}"
+    )
+    for remainder in range(partitions):
+        op.execute(f'CREATE TABLE contacts_p{remainder} PARTITION OF contacts_new '
+                   f'FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})')
+    op.execute(f'INSERT INTO contacts_new ({COLUMNS}) SELECT {COLUMNS} FROM contacts')
+    op.execute('DROP TABLE contacts')
+    op.execute('ALTER TABLE contacts_new RENAME TO contacts')
+    op.execute('ALTER TABLE contacts RENAME CONSTRAINT contacts_new_pkey TO contacts_pkey')
+    if partitions:
+        op.execute('ALTER TABLE contacts RENAME CONSTRAINT contacts_new_owner_id_email_key TO contacts_owner_id_email_key')
+    op.execute('ALTER SEQUENCE contacts_id_seq OWNED BY contacts.id')
+    for statement in COMMON_INDEXES + ([] if partitions else PLAIN_INDEXES) + TRIGGERS:
+        op.execute(statement)
+
+
+def upgrade() -> None:
+    partitions = int(context.get_x_argument(as_dictionary=True).get('contacts_partitions', settings.contacts_partitions))
+    if not partitions or op.get_bind().dialect.name != 'postgresql' or is_partitioned():
+        return
+    orphans = op.get_bind().execute(sa.text('SELECT count(*) FROM contacts WHERE owner_id IS NULL')).scalar()
+    if orphans:
+        raise RuntimeError(f'{orphans} contacts have no owner and cannot be placed in a partition')
+    rebuild(partitions)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql' or not is_partitioned():
+        return
+    rebuild(0)
@@ -0,0 +1,71 @@
+"""Contacts version triggers
+
+Revision ID: f0b2a4fa2d11
+Revises: a3e2b2e4165d
+Create Date: 2026-10-18 16:21:40.318254
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f0b2a4fa2d11'
+down_revision: Union[str, None] = 'a3e2b2e4165d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TRIGGERS = ('contacts_version_au', 'contacts_version_ad', 'contacts_version_ai')
+BUMP = 'UPDATE users SET contacts_version = contacts_version + 1'
+
+SQLITE_DDL = [
+    f"CREATE TRIGGER contacts_version_ai AFTER INSERT ON contacts BEGIN {BUMP} WHERE id = new.owner_id; END",
+    f"CREATE TRIGGER contacts_version_ad AFTER DELETE ON contacts BEGIN {BUMP} WHERE id = old.owner_id; END",
+    f"CREATE TRIGGER contacts_version_au AFTER UPDATE ON contacts BEGIN "
+    f"{BUMP} WHERE id IN (old.owner_id, new.owner_id); END",
+]
+
+POSTGRESQL_DDL = [
+    f"""CREATE OR REPLACE FUNCTION contacts_bump_version() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        {BUMP} WHERE id IN (SELECT owner_id FROM new_rows);
+    ELSIF TG_OP = 'DELETE' THEN
+        {BUMP} WHERE id IN (SELECT owner_id FROM old_rows);
+    ELSE
+        {BUMP} WHERE id IN (SELECT owner_id FROM old_rows UNION SELECT owner_id FROM new_rows);
+    END IF;
+    RETURN NULL;
+END $$""",
+    "CREATE TRIGGER contacts_version_ai AFTER INSERT ON contacts REFERENCING NEW TABLE AS new_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION contacts_bump_version()",
+    "CREATE TRIGGER contacts_version_ad AFTER DELETE ON contacts REFERENCING OLD TABLE AS old_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION contacts_bump_version()",
+    "CREATE TRIGGER contacts_version_au AFTER UPDATE ON contacts REFERENCING OLD TABLE AS old_rows "
+    "NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION contacts_bump_version()",
+]
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        statements = POSTGRESQL_DDL
+    elif dialect == 'sqlite':
+        statements = SQLITE_DDL
+    else:
+        return
+    for statement in statements:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        for trigger in TRIGGERS:
+            op.execute(f'DROP TRIGGER IF EXISTS {trigger} ON contacts')
+        op.execute('DROP FUNCTION IF EXISTS contacts_bump_version()')
+    elif dialect == 'sqlite':
+        for trigger in TRIGGERS:
+            op.execute(f'DROP TRIGGER IF EXISTS {trigger}')
@@ -0,0 +1,84 @@
+"""
+p99 latency of GET /contacts/ while logins run concurrently.
+
+Runs the real ``main.app`` in-process over the httpx ASGI transport against a
+throwaway SQLite database. ``--blocking`` verifies passwords on the event loop
+the way the old ``authenticate_user`` did, for comparison.
+
+Usage:
+    python -m benchmarks.bench_login_contention [--blocking] [--logins 8] [--requests 200]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+import httpx
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from main import app
+from src.database.db import get_db
+from src.database.models import Base, User
+from src.utils import utils
+from src.utils.password import get_password_hash, verify_password
+from src.utils.utils import create_access_token
+
+EMAIL = "bench@example.com"
+PASSWORD = "12345678"
+
+
+async def login_loop(client: httpx.AsyncClient, stop: asyncio.Event):
+    while not stop.is_set():
+        await client.post("/auth/login/", data={"username": EMAIL, "password": PASSWORD})
+
+
+async def main(args):
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with session_maker() as session:
+        session.add(User(email=EMAIL, hashed_password=get_password_hash(PASSWORD), is_verified=True))
+        await session.commit()
+
+    async def override_get_db():
+        async with session_maker() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    if args.blocking:
+        async def blocking_verify(plain_password, hashed_password):
+            return verify_password(plain_password, hashed_password)
+        utils.verify_password_async = blocking_verify
+
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': EMAIL})}"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        stop = asyncio.Event()
+        logins = [asyncio.create_task(login_loop(client, stop)) for _ in range(args.logins)]
+        latencies = []
+        for _ in range(args.requests):
+            start = time.perf_counter()
+            response = await client.get("/contacts/", headers=headers)
+            latencies.append((time.perf_counter() - start) * 1000)
+            assert response.status_code == 200, response.text
+        stop.set()
+        await asyncio.gather(*logins)
+    await engine.dispose()
+
+    latencies.sort()
+    mode = "blocking" if args.blocking else "pool"
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f"{mode}: concurrent logins={args.logins} requests={args.requests} "
+          f"p50={statistics.median(latencies):.1f}ms p99={p99:.1f}ms max={latencies[-1]:.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--blocking", action="store_true")
+    parser.add_argument("--logins", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200)
+    asyncio.run(main(parser.parse_args()))
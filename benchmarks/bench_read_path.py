@@ -0,0 +1,82 @@
+"""
+Rows/sec of the contact list read path: ORM + joinedload + response model
+validation (the previous path) vs column projection + direct row serialization.
+
+Usage:
+    python -m benchmarks.bench_read_path [--seconds 2]
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from datetime import date
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import joinedload
+
+from src.database.models import Base, Contact, User
+from src.repository.contacts import get_contacts
+from src.schemas.schemas import Contact as ContactSchema
+from src.utils.responses import contacts_response
+
+PAGE_SIZES = (10, 100, 1000)
+contacts_adapter = TypeAdapter(List[ContactSchema])
+
+
+async def orm_page(session, limit):
+    result = await session.execute(
+        select(Contact).options(joinedload(Contact.owner)).where(Contact.owner_id == 1).limit(limit)
+    )
+    contacts = result.scalars().all()
+    body = json.dumps(jsonable_encoder(contacts_adapter.validate_python(contacts, from_attributes=True))).encode()
+    session.expunge_all()
+    return body
+
+
+async def lean_page(session, limit):
+    return contacts_response(await get_contacts(session, limit=limit, owner_id=1)).body
+
+
+async def rows_per_second(session_maker, page, limit, seconds):
+    async with session_maker() as session:
+        rows = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < seconds:
+            await page(session, limit)
+            rows += limit
+        return rows / (time.perf_counter() - start)
+
+
+async def main(args):
+    path = os.path.join(tempfile.mkdtemp(), "read.db")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with session_maker() as session:
+        await session.execute(insert(User), [{"id": 1, "email": "owner@example.com"}])
+        await session.execute(insert(Contact), [{
+            "first_name": f"First{i}", "last_name": f"Last{i}", "email": f"contact{i}@example.com",
+            "phone_number": "1234567890", "birthday": date(1990, 1 + i % 12, 1 + i % 28),
+            "additional_info": "Some info", "owner_id": 1,
+        } for i in range(max(PAGE_SIZES))])
+        await session.commit()
+
+    print(f"{'page':>6}{'orm rows/s':>14}{'lean rows/s':>14}{'speedup':>10}")
+    for limit in PAGE_SIZES:
+        orm = await rows_per_second(session_maker, orm_page, limit, args.seconds)
+        lean = await rows_per_second(session_maker, lean_page, limit, args.seconds)
+        print(f"{limit:>6}{orm:>14.0f}{lean:>14.0f}{lean / orm:>9.2f}x")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=2.0)
+    asyncio.run(main(parser.parse_args()))
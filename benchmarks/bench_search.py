@@ -0,0 +1,97 @@
+"""
+Contact search latency: legacy ``LIKE '%q%'`` scan vs the indexed search backend.
+
+Seeds ``--contacts`` rows spread over ``--owners`` owners (SQLite by default, or
+``--url postgresql+asyncpg://...``) and times ``search_contacts`` for one owner.
+
+Usage:
+    python -m benchmarks.bench_search [--contacts 1000000] [--owners 10] [--url URL]
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import string
+import tempfile
+import time
+from datetime import date
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.database.models import Base, Contact, User
+from src.repository.contacts import search_contacts
+
+QUERIES = ["smith", "ann", "example.org", "vip", "zzz"]
+WORDS = ["smith", "johnson", "anna", "brown", "taylor", "martin", "walker", "young", "king", "wright"]
+
+
+def random_word(rnd: random.Random) -> str:
+    return rnd.choice(WORDS) + "".join(rnd.choices(string.ascii_lowercase, k=4))
+
+
+async def seed(session_maker, contacts: int, owners: int, batch: int = 10000):
+    rnd = random.Random(42)
+    async with session_maker() as session:
+        await session.execute(insert(User), [{"id": i + 1, "email": f"owner{i}@example.com"} for i in range(owners)])
+        for start in range(0, contacts, batch):
+            rows = []
+            for i in range(start, min(start + batch, contacts)):
+                rows.append({
+                    "first_name": random_word(rnd), "last_name": random_word(rnd),
+                    "email": f"user{i}@example.{rnd.choice(['com', 'org', 'net'])}",
+                    "phone_number": str(rnd.randint(10 ** 9, 10 ** 10)),
+                    "birthday": date(1970 + rnd.randint(0, 40), rnd.randint(1, 12), rnd.randint(1, 28)),
+                    "additional_info": "vip client" if rnd.random() < 0.01 else None,
+                    "owner_id": i % owners + 1,
+                })
+            await session.execute(insert(Contact), rows)
+        await session.commit()
+
+
+async def legacy_search(db, query: str, owner_id: int):
+    result = await db.execute(select(Contact).where(
+        (Contact.owner_id == owner_id) &
+        (Contact.first_name.contains(query) | Contact.last_name.contains(query) | Contact.email.contains(query))
+    ))
+    return result.scalars().all()
+
+
+async def timed(func, session_maker, query: str, repeat: int):
+    samples = []
+    async with session_maker() as session:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            rows = await func(session, query, 1)
+            samples.append((time.perf_counter() - start) * 1000)
+            session.expunge_all()
+    return statistics.median(samples), len(rows)
+
+
+async def main(args):
+    url = args.url or f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'search.db')}"
+    engine = create_async_engine(url)
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    start = time.perf_counter()
+    await seed(session_maker, args.contacts, args.owners)
+    print(f"seeded {args.contacts} contacts in {time.perf_counter() - start:.1f}s ({engine.dialect.name})")
+
+    print(f"{'query':<14}{'legacy ms':>12}{'rows':>8}{'indexed ms':>12}{'rows':>8}")
+    for query in QUERIES:
+        legacy_ms, legacy_rows = await timed(legacy_search, session_maker, query, args.repeat)
+        indexed_ms, indexed_rows = await timed(search_contacts, session_maker, query, args.repeat)
+        print(f"{query:<14}{legacy_ms:>12.1f}{legacy_rows:>8}{indexed_ms:>12.1f}{indexed_rows:>8}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--contacts", type=int, default=1_000_000)
+    parser.add_argument("--owners", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--url")
+    asyncio.run(main(parser.parse_args()))
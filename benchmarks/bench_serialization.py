@@ -0,0 +1,91 @@
+"""
+CPU time to serialize one 1000-contact page of a list endpoint.
+
+Compares FastAPI's default path (response model validation of ORM objects,
+``jsonable_encoder`` and stdlib ``json``) with the row-based paths of
+``contacts_response``: stdlib JSON, orjson (``FAST_RESPONSES``) and MessagePack.
+No database is involved; the rows are built in memory.
+
+Usage:
+    python -m benchmarks.bench_serialization [--rows 1000] [--repeat 200]
+"""
+import argparse
+import json
+import time
+from datetime import date
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from starlette.requests import Request
+
+from src.config.settings import settings
+from src.database.models import Contact
+from src.schemas.schemas import Contact as ContactSchema
+from src.utils.responses import contacts_response
+
+contacts_adapter = TypeAdapter(List[ContactSchema])
+
+
+def make_rows(count: int) -> list:
+    return [{
+        "id": i, "first_name": f"First{i}", "last_name": f"Last{i}", "email": f"contact{i}@example.com",
+        "phone_number": "1234567890", "birthday": date(1990, 1 + i % 12, 1 + i % 28),
+        "additional_info": "Some info", "owner_id": 1,
+    } for i in range(count)]
+
+
+def make_request(accept: str) -> Request:
+    return Request({"type": "http", "method": "GET", "path": "/contacts/", "query_string": b"",
+                    "headers": [(b"accept", accept.encode())]})
+
+
+def fastapi_default(contacts, rows):
+    validated = contacts_adapter.validate_python(contacts, from_attributes=True)
+    return json.dumps(jsonable_encoder(validated)).encode()
+
+
+def rows_json(contacts, rows):
+    settings.fast_responses = False
+    return contacts_response(rows, request=make_request("application/json")).body
+
+
+def rows_orjson(contacts, rows):
+    settings.fast_responses = True
+    return contacts_response(rows, request=make_request("application/json")).body
+
+
+def rows_msgpack(contacts, rows):
+    return contacts_response(rows, request=make_request("application/msgpack")).body
+
+
+def cpu_ms(serialize, contacts, rows, repeat: int) -> float:
+    serialize(contacts, rows)
+    start = time.process_time()
+    for _ in range(repeat):
+        serialize(contacts, rows)
+    return (time.process_time() - start) * 1000 / repeat
+
+
+def main(args):
+    rows = make_rows(args.rows)
+    contacts = [Contact(**row) for row in rows]
+    fast_responses = settings.fast_responses
+    baseline = None
+    print(f"{'path':<18}{'cpu ms/page':>12}{'bytes':>9}{'speedup':>9}")
+    try:
+        for name, serialize in (("fastapi default", fastapi_default), ("rows + json", rows_json),
+                                ("rows + orjson", rows_orjson), ("rows + msgpack", rows_msgpack)):
+            elapsed = cpu_ms(serialize, contacts, rows, args.repeat)
+            baseline = baseline or elapsed
+            size = len(serialize(contacts, rows))
+            print(f"{name:<18}{elapsed:>12.2f}{size:>9}{baseline / elapsed:>8.1f}x")
+    finally:
+        settings.fast_responses = fast_responses
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=200)
+    main(parser.parse_args())
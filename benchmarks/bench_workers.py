@@ -0,0 +1,97 @@
+"""
+Throughput of ``serve.py`` for a growing number of worker processes.
+
+For every worker count the server is started as a subprocess against a
+throwaway SQLite database, then ``--clients`` client processes, each with
+``--concurrency`` connections, request ``--path`` for ``--seconds``. The load
+generators run in their own processes so they do not compete with a single
+event loop; on a machine with N cores expect throughput to grow until the
+workers plus the clients saturate them.
+
+Usage:
+    python -m benchmarks.bench_workers [--workers 1,2,4] [--path /stats/] [--seconds 5]
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from serve import cpu_count
+
+
+async def _drive(url: str, concurrency: int, seconds: float) -> int:
+    done = 0
+    deadline = time.perf_counter() + seconds
+
+    async def worker(client):
+        nonlocal done
+        while time.perf_counter() < deadline:
+            response = await client.get(url)
+            response.raise_for_status()
+            done += 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits) as client:
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+    return done
+
+
+def drive(args) -> int:
+    return asyncio.run(_drive(*args))
+
+
+def wait_ready(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.TransportError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server did not start within {timeout} s")
+
+
+def measure(workers: int, args) -> float:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite+aiosqlite:///{tmp}/bench.db",
+                   RATE_LIMIT_ENABLED="false", EMAIL_OUTBOX_WORKER="false")
+        server = subprocess.Popen(
+            [sys.executable, "serve.py", "--workers", str(workers), "--port", str(args.port)],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        url = f"http://127.0.0.1:{args.port}{args.path}"
+        try:
+            wait_ready(url)
+            with multiprocessing.Pool(args.clients) as pool:
+                counts = pool.map(drive, [(url, args.concurrency, args.seconds)] * args.clients)
+        finally:
+            server.terminate()
+            server.wait(timeout=args.seconds + 30)
+    return sum(counts) / args.seconds
+
+
+def main(args):
+    print(f"available CPUs: {cpu_count()}")
+    print(f"{'workers':>8}{'req/s':>10}{'scaling':>9}")
+    single = None
+    for workers in (int(n) for n in args.workers.split(",")):
+        throughput = measure(workers, args)
+        single = single or throughput
+        print(f"{workers:>8}{throughput:>10.0f}{throughput / single:>8.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--path", default="/stats/")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--clients", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    main(parser.parse_args())
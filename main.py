@@ -1,13 +1,102 @@
+import time
+
+_import_start = time.perf_counter()
+
+import contextlib
+import logging
+
 import redis.asyncio as redis
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi_limiter import FastAPILimiter
+from fastapi.staticfiles import StaticFiles
+from redis.exceptions import RedisError
+from sqlalchemy import text
 
 from src.config.settings import settings
-from src.database.db import engine, Base
+from src.database.db import engine, sessionmanager
+from src.database.models import Base
+from src.database.schema import check_schema
 from src.routes import contacts, auth
+from src.utils.avatar import AvatarSizeLimitMiddleware, avatar_executor
+from src.utils.cache import contacts_cache, set_redis, user_cache
+from src.utils.email import outbox_worker
+from src.utils.metrics import MetricsMiddleware, instrument_engine, metrics
+from src.utils.password import password_hasher
+from src.utils.profiler import QueryProfilerMiddleware, query_profiler
+from src.utils.rate_limit import rate_limiter
+
+logger = logging.getLogger(__name__)
+
+# Seconds spent in each startup phase of this worker.
+startup_timings = {"imports": time.perf_counter() - _import_start}
+
+
+@contextlib.contextmanager
+def startup_phase(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        startup_timings[name] = time.perf_counter() - start
+
+
+async def prepare_schema() -> None:
+    """
+    Bring up the schema according to ``settings.schema_startup``:
 
-app = FastAPI()
+    - ``"create_all"`` creates missing tables (development and tests);
+    - ``"check"`` only verifies that Alembic migrated the database to the head
+      revision, which is one query instead of DDL for every table;
+    - ``"skip"`` does nothing.
+    """
+    if settings.schema_startup == "check":
+        await check_schema(engine)
+    elif settings.schema_startup == "create_all":
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Open the shared resources before the first request and release them after
+    the server has drained the in-flight ones.
+    """
+    started = time.perf_counter()
+    with startup_phase("redis"):
+        redis_client = redis.from_url(f"redis://{settings.redis_host}:{settings.redis_port}")
+        try:
+            await redis_client.ping()
+        except RedisError as err:
+            logger.warning(f"Redis is not reachable, caches will retry on use: {err}")
+        set_redis(redis_client)
+    with startup_phase("database"):
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    with startup_phase("schema"):
+        await prepare_schema()
+    with startup_phase("workers"):
+        rate_limiter.start()
+        if settings.email_outbox_worker:
+            outbox_worker.start()
+    startup_timings["lifespan"] = time.perf_counter() - started
+    logging.getLogger("uvicorn.error").info(
+        "Startup: " + ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in startup_timings.items())
+    )
+    try:
+        yield
+    finally:
+        await outbox_worker.stop()
+        await rate_limiter.stop()
+        password_hasher.shutdown()
+        avatar_executor.shutdown(wait=False, cancel_futures=True)
+        set_redis(None)
+        await redis_client.aclose()
+        await sessionmanager.close()
+
+
+app = FastAPI(lifespan=lifespan)
 
 origins = [
     "http://localhost",
@@ -21,16 +110,50 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
+app.add_middleware(AvatarSizeLimitMiddleware)
+app.add_middleware(QueryProfilerMiddleware)
+app.add_middleware(MetricsMiddleware)
+
+# Reads mostly go to the replicas once they are configured, so those are
+# instrumented too.
+for db_engine in sessionmanager.engines:
+    instrument_engine(db_engine)
+    query_profiler.instrument(db_engine)
+metrics.gauges.update(
+    user_cache=user_cache.stats,
+    contacts_cache=contacts_cache.stats,
+    db_pool=sessionmanager.pool_stats,
+    db_replicas=sessionmanager.replica_stats,
+    db_replica_pools=sessionmanager.replica_pool_stats,
+    query_profiler=query_profiler.stats,
+    rate_limiter=rate_limiter.stats,
+    startup_seconds=startup_timings.copy,
+)
+
+
+@app.get("/stats/")
+async def stats():
+    return {
+        "user_cache": user_cache.stats(),
+        "contacts_cache": contacts_cache.stats(),
+        "db_pool": sessionmanager.pool_stats(),
+        "db_replicas": sessionmanager.replica_stats(),
+        "db_replica_pools": sessionmanager.replica_pool_stats(),
+        "query_profiler": query_profiler.stats(),
+        "rate_limiter": rate_limiter.stats(),
+        "startup": startup_timings,
+    }
+
 
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
-@app.on_event("startup")
-async def startup():
-    redis_client = redis.from_url(f"redis://{settings.redis_host}:{settings.redis_port}")
-    await FastAPILimiter.init(redis_client)
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
 
+if settings.media_storage == "local":
+    app.mount(settings.media_url, StaticFiles(directory=settings.media_root, check_dir=False), name="media")
 
 app.include_router(auth.router)
 app.include_router(contacts.router)
@@ -0,0 +1,68 @@
+"""
+Production entry point: ``python serve.py [--workers N] [--host H] [--port P]``.
+
+Runs uvicorn with one worker process per available CPU (``WEB_WORKERS`` or
+``--workers`` override it), the uvloop event loop and the httptools parser when
+they are installed, and a bounded graceful shutdown: on SIGTERM every worker
+stops accepting connections, waits up to ``GRACEFUL_SHUTDOWN_TIMEOUT`` seconds
+for in-flight requests and then runs the shutdown part of the lifespan handler.
+
+``X-Forwarded-For`` and ``X-Forwarded-Proto`` are only trusted from the
+addresses in ``FORWARDED_ALLOW_IPS`` (``--forwarded-allow-ips``), a comma
+separated list that defaults to ``127.0.0.1``. Behind a load balancer set it
+to the balancer's address or subnet; the client address the rate limiter
+sees comes from that header, so ``*`` would let any client choose its own.
+"""
+import argparse
+import importlib.util
+import os
+
+import uvicorn
+
+from src.config.settings import settings
+
+
+def cpu_count() -> int:
+    """
+    Number of CPUs this process may run on, honouring affinity masks (e.g. ``taskset`` or cpusets).
+    """
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def worker_count(requested: int = 0) -> int:
+    """
+    Return ``requested`` if positive, otherwise one worker per available CPU.
+    """
+    return requested if requested > 0 else cpu_count()
+
+
+def main(args):
+    uvicorn.run(
+        "main:app",
+        host=args.host,
+        port=args.port,
+        workers=worker_count(args.workers),
+        loop="uvloop" if importlib.util.find_spec("uvloop") else "auto",
+        http="httptools" if importlib.util.find_spec("httptools") else "auto",
+        lifespan="on",
+        proxy_headers=True,
+        forwarded_allow_ips=args.forwarded_allow_ips,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        access_log=False,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default=settings.web_host)
+    parser.add_argument("--port", type=int, default=settings.web_port)
+    parser.add_argument("--workers", type=int, default=settings.web_workers,
+                        help="worker processes, 0 for one per available CPU")
+    parser.add_argument("--graceful-timeout", type=int, default=settings.graceful_shutdown_timeout,
+                        help="seconds to wait for in-flight requests on shutdown")
+    parser.add_argument("--forwarded-allow-ips", default=settings.forwarded_allow_ips,
+                        help="comma separated proxy addresses whose X-Forwarded-* headers are trusted")
+    main(parser.parse_args())
@@ -1,3 +1,5 @@
+from typing import Dict, List
+
 from pydantic import ConfigDict
 from pydantic_settings import BaseSettings
 
@@ -7,6 +9,7 @@ class Settings(BaseSettings):
     POSTGRES_PASSWORD: str
     POSTGRES_PORT: int
     DATABASE_URL: str
+    DATABASE_REPLICA_URLS: List[str] = []
     secret_key: str
     algorithm: str
     mail_username: str
@@ -19,6 +22,63 @@ class Settings(BaseSettings):
     cloudinary_name: str
     cloudinary_api_key: str
     cloudinary_api_secret: str
+    db_echo: bool = False
+    db_pool_size: int = 10
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    db_statement_cache_size: int = 100
+    db_replica_selection: str = "round_robin"
+    db_read_your_writes_seconds: float = 5.0
+    slow_query_threshold_ms: float = 100.0
+    slow_query_explain: bool = False
+    query_repeat_threshold: int = 5
+    user_cache_size: int = 1024
+    user_cache_local_ttl: int = 5
+    user_cache_ttl: int = 300
+    contacts_cache_ttl: int = 300
+    password_hash_workers: int = 4
+    password_hash_max_queue: int = 64
+    password_hash_executor: str = "thread"
+    import_batch_size: int = 1000
+    import_max_errors: int = 100
+    import_max_record_length: int = 64 * 1024
+    export_chunk_size: int = 1000
+    fast_responses: bool = False
+    rate_limit_enabled: bool = True
+    rate_limits: Dict[str, str] = {
+        "default": "600/60",
+        "contacts": "600/60",
+        "auth": "120/60",
+        "auth.login": "10/60",
+        "auth.register": "5/3600",
+    }
+    rate_limit_sync_interval: float = 1.0
+    mail_from_name: str = "Example email"
+    mail_starttls: bool = False
+    mail_ssl_tls: bool = True
+    mail_use_credentials: bool = True
+    mail_validate_certs: bool = True
+    email_outbox_worker: bool = True
+    email_outbox_batch_size: int = 50
+    email_outbox_concurrency: int = 2
+    email_outbox_poll_interval: float = 5.0
+    email_outbox_max_attempts: int = 5
+    email_outbox_backoff: float = 30.0
+    media_storage: str = "cloudinary"
+    media_root: str = "media"
+    media_url: str = "/media"
+    avatar_max_bytes: int = 5 * 1024 * 1024
+    avatar_max_pixels: int = 40_000_000
+    avatar_workers: int = 2
+    web_host: str = "0.0.0.0"
+    web_port: int = 8000
+    web_workers: int = 0
+    graceful_shutdown_timeout: int = 30
+    forwarded_allow_ips: str = "127.0.0.1"
+    schema_startup: str = "create_all"
+    contacts_partitions: int = 0
 
     class Config:
         env_file = ".env"
@@ -1,19 +1,175 @@
 import contextlib
+import itertools
+import time
+from typing import Optional, Sequence
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
-from sqlalchemy.orm import declarative_base
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from src.config.settings import settings
+from src.utils.cache import recent_writes
 
-Base = declarative_base()
 DATABASE_URL = settings.DATABASE_URL
 
-engine: AsyncEngine = create_async_engine(DATABASE_URL, echo=True)
-SessionLocal = async_sessionmaker(autoflush=False, autocommit=False, bind=engine)
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that also records how long checkouts wait for a connection.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            self.checkouts += 1
+            self.wait_time_total += waited
+            self.wait_time_max = max(self.wait_time_max, waited)
+
+
+def create_db_engine(url: str) -> AsyncEngine:
+    """
+    Create an async engine configured from the ``db_*`` settings.
+
+    In-memory SQLite databases keep SQLAlchemy's default single-connection pool;
+    every other database gets an instrumented queue pool.
+    """
+    url = make_url(url)
+    kwargs = {"echo": settings.db_echo, "pool_pre_ping": settings.db_pool_pre_ping}
+    if url.database not in (None, "", ":memory:"):
+        kwargs.update(
+            poolclass=InstrumentedQueuePool,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+            pool_recycle=settings.db_pool_recycle,
+        )
+    if url.get_driver_name() == "asyncpg":
+        kwargs["connect_args"] = {
+            "prepared_statement_cache_size": settings.db_statement_cache_size,
+            "statement_cache_size": settings.db_statement_cache_size,
+        }
+    return create_async_engine(url, **kwargs)
+
+
+def get_pool_stats(engine: AsyncEngine) -> dict:
+    """
+    Return live connection pool statistics of an engine.
+    """
+    pool = engine.pool
+    if not isinstance(pool, InstrumentedQueuePool):
+        return {"status": pool.status()}
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "checkouts": pool.checkouts,
+        "timeouts": pool.timeouts,
+        "wait_time_total": pool.wait_time_total,
+        "wait_time_max": pool.wait_time_max,
+    }
 
 
 class DatabaseSessionManager:
-    def __init__(self, url: str):
-        self._engine: AsyncEngine = create_async_engine(url)
-        self._session_maker: async_sessionmaker = async_sessionmaker(autoflush=False, autocommit=False, bind=self._engine)
+    """
+    Owns the engine of the primary database and of its optional read replicas.
+
+    Writes and everything that needs the latest data use the primary. Read-only
+    endpoints take a ``read_session``, which is served by a replica chosen by
+    ``replica_selection``:
+
+    - ``"round_robin"`` cycles through the replicas;
+    - ``"least_connections"`` picks the replica with the fewest sessions open
+      in this process, ties broken round-robin.
+
+    Attributes:
+    -----------
+    replica_selection : str
+        ``"round_robin"`` or ``"least_connections"``.
+    primary_reads : int
+        Read sessions served by the primary (no replicas, or read-your-writes).
+    replica_reads : list
+        Read sessions served by each replica.
+    """
+
+    def __init__(self, url: str, replica_urls: Sequence[str] = (), replica_selection: str = "round_robin"):
+        self._engine: AsyncEngine = create_db_engine(url)
+        # Writes return their rows through RETURNING instead of a refresh, so
+        # committed objects must stay readable.
+        self._session_maker: async_sessionmaker = async_sessionmaker(
+            autoflush=False, autocommit=False, expire_on_commit=False, bind=self._engine
+        )
+        self._replicas = [create_db_engine(replica_url) for replica_url in replica_urls]
+        self._replica_makers = [
+            async_sessionmaker(autoflush=False, autocommit=False, expire_on_commit=False, bind=replica)
+            for replica in self._replicas
+        ]
+        self._replica_sessions = [0] * len(self._replicas)
+        self._round_robin = itertools.count()
+        self.replica_selection = replica_selection
+        self.primary_reads = 0
+        self.replica_reads = [0] * len(self._replicas)
+
+    @property
+    def engine(self) -> AsyncEngine:
+        return self._engine
+
+    @property
+    def session_maker(self) -> async_sessionmaker:
+        return self._session_maker
+
+    @property
+    def replicas(self) -> list:
+        return self._replicas
+
+    @property
+    def engines(self) -> list:
+        """
+        The primary engine followed by the replica engines.
+        """
+        return [self._engine, *self._replicas]
+
+    def _choose_replica(self) -> int:
+        start = next(self._round_robin) % len(self._replicas)
+        if self.replica_selection != "least_connections":
+            return start
+        order = [(start + offset) % len(self._replicas) for offset in range(len(self._replicas))]
+        return min(order, key=self._replica_sessions.__getitem__)
+
+    @contextlib.asynccontextmanager
+    async def read_session(self, primary: bool = False, session_maker: Optional[async_sessionmaker] = None):
+        """
+        Open a session for read-only work on a replica, or on the primary if
+        ``primary`` is set or no replica is configured. ``session_maker``
+        replaces the primary's own factory, e.g. when it is overridden as a dependency.
+        """
+        if primary or not self._replicas:
+            self.primary_reads += 1
+            async with (session_maker or self._session_maker)() as session:
+                yield session
+            return
+        index = self._choose_replica()
+        self.replica_reads[index] += 1
+        self._replica_sessions[index] += 1
+        try:
+            async with self._replica_makers[index]() as session:
+                yield session
+        finally:
+            self._replica_sessions[index] -= 1
 
     @contextlib.asynccontextmanager
     async def session(self):
@@ -28,7 +184,42 @@ class DatabaseSessionManager:
         finally:
             await session.close()
 
-sessionmanager = DatabaseSessionManager(settings.DATABASE_URL)
+    def pool_stats(self) -> dict:
+        return get_pool_stats(self._engine)
+
+    def replica_stats(self) -> dict:
+        stats = {"replicas": len(self._replicas), "primary_reads": self.primary_reads}
+        for index, reads in enumerate(self.replica_reads):
+            stats[f"replica_{index}_reads"] = reads
+            stats[f"replica_{index}_sessions"] = self._replica_sessions[index]
+        return stats
+
+    def replica_pool_stats(self) -> dict:
+        stats = {}
+        for index, replica in enumerate(self._replicas):
+            for name, value in get_pool_stats(replica).items():
+                stats[f"replica_{index}_{name}"] = value
+        return stats
+
+    async def close(self):
+        await self._engine.dispose()
+        for replica in self._replicas:
+            await replica.dispose()
+
+sessionmanager = DatabaseSessionManager(
+    settings.DATABASE_URL,
+    replica_urls=settings.DATABASE_REPLICA_URLS,
+    replica_selection=settings.db_replica_selection,
+)
+engine: AsyncEngine = sessionmanager.engine
+SessionLocal = sessionmanager.session_maker
+
+@event.listens_for(Session, "after_commit")
+def _remember_write(session):
+    # ``get_current_user`` tags the request's session with the user it acts for.
+    user_id = session.info.get("user_id")
+    if user_id is not None:
+        recent_writes.mark(user_id)
 
 async def get_db():
     async with SessionLocal() as session:
@@ -36,3 +227,10 @@ async def get_db():
             yield session
         finally:
             await session.close()
+
+def get_session_maker() -> async_sessionmaker:
+    """
+    Provide the session factory to endpoints that manage their own session,
+    e.g. streaming responses that outlive the request-scoped ``get_db`` session.
+    """
+    return SessionLocal
@@ -1,8 +1,22 @@
-from sqlalchemy import Column, Integer, String, Date, Text, Boolean, ForeignKey
-from sqlalchemy.orm import relationship, declarative_base
+from datetime import datetime
+from sqlalchemy import (Column, Integer, String, Date, DateTime, Text, Boolean, ForeignKey, Index, DDL, event,
+                        PrimaryKeyConstraint, UniqueConstraint)
+from sqlalchemy.orm import relationship, declarative_base, validates
+from src.config.settings import settings
 
 Base = declarative_base()
 
+# Hash partitions of contacts by owner (PostgreSQL only, see migration d5a8c3e7f104).
+# The partitioned layout keys contacts by (owner_id, id), makes emails unique per
+# owner and has no single-column indexes, so the model follows the setting.
+CONTACTS_PARTITIONS = settings.contacts_partitions if settings.DATABASE_URL.startswith("postgresql") else 0
+
+def get_birthday_key(value):
+    """
+    Return the month-day key (``MMDD`` as an integer) of a birthday, e.g. 1231 for December 31.
+    """
+    return value.month * 100 + value.day if value is not None else None
+
 class Contact(Base):
     """
     Represents a contact.
@@ -23,22 +37,120 @@ class Contact(Base):
         Birthday of the contact.
     additional_info : str, optional
         Additional information about the contact.
+    birthday_key : int
+        Month and day of the birthday as ``MMDD``, kept in sync with ``birthday``.
     owner_id : int
         ID of the user who owns this contact.
     """
     __tablename__ = "contacts"
 
-    id = Column(Integer, primary_key=True, index=True)
-    first_name = Column(String, index=True)
-    last_name = Column(String, index=True)
-    email = Column(String, unique=True, index=True)
-    phone_number = Column(String, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True, index=not CONTACTS_PARTITIONS)
+    first_name = Column(String, index=not CONTACTS_PARTITIONS)
+    last_name = Column(String, index=not CONTACTS_PARTITIONS)
+    email = Column(String, unique=not CONTACTS_PARTITIONS, index=not CONTACTS_PARTITIONS)
+    phone_number = Column(String, index=not CONTACTS_PARTITIONS)
     birthday = Column(Date)
     additional_info = Column(Text, nullable=True)
-    owner_id = Column(Integer, ForeignKey("users.id"))
+    birthday_key = Column(Integer)
+    owner_id = Column(Integer, ForeignKey("users.id"), primary_key=bool(CONTACTS_PARTITIONS),
+                      nullable=not CONTACTS_PARTITIONS)
 
     owner = relationship("User", back_populates="contacts")
 
+    __table_args__ = (
+        *((
+            PrimaryKeyConstraint("owner_id", "id", name="contacts_pkey"),
+            UniqueConstraint("owner_id", "email", name="contacts_owner_id_email_key"),
+        ) if CONTACTS_PARTITIONS else (
+            Index("ix_contacts_owner_id_id", "owner_id", "id"),
+        )),
+        Index("ix_contacts_owner_id_last_name_first_name_id", "owner_id", "last_name", "first_name", "id"),
+        Index("ix_contacts_owner_id_birthday_key", "owner_id", "birthday_key"),
+        *(
+            Index(f"ix_contacts_{name}_trgm", name, postgresql_using="gin",
+                  postgresql_ops={name: "gin_trgm_ops"}).ddl_if(dialect="postgresql")
+            for name in ("first_name", "last_name", "email", "additional_info")
+        ),
+        {"postgresql_partition_by": "HASH (owner_id)"} if CONTACTS_PARTITIONS else {},
+    )
+
+    @validates("birthday")
+    def _sync_birthday_key(self, key, value):
+        self.birthday_key = get_birthday_key(value)
+        return value
+
+# Search backends: pg_trgm GIN indexes on PostgreSQL (declared above) and an
+# FTS5 trigram shadow table on SQLite, kept in sync with contacts by triggers.
+CONTACT_SEARCH_COLUMNS = ("first_name", "last_name", "email", "additional_info")
+
+_fts_columns = ", ".join(CONTACT_SEARCH_COLUMNS)
+_fts_new = ", ".join(f"new.{name}" for name in CONTACT_SEARCH_COLUMNS)
+_fts_old = ", ".join(f"old.{name}" for name in CONTACT_SEARCH_COLUMNS)
+
+CONTACTS_FTS_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS contacts_fts USING fts5("
+    f"{_fts_columns}, content='contacts', content_rowid='id', tokenize='trigram')",
+    f"CREATE TRIGGER IF NOT EXISTS contacts_fts_ai AFTER INSERT ON contacts BEGIN "
+    f"INSERT INTO contacts_fts(rowid, {_fts_columns}) VALUES (new.id, {_fts_new}); END",
+    f"CREATE TRIGGER IF NOT EXISTS contacts_fts_ad AFTER DELETE ON contacts BEGIN "
+    f"INSERT INTO contacts_fts(contacts_fts, rowid, {_fts_columns}) VALUES ('delete', old.id, {_fts_old}); END",
+    f"CREATE TRIGGER IF NOT EXISTS contacts_fts_au AFTER UPDATE ON contacts BEGIN "
+    f"INSERT INTO contacts_fts(contacts_fts, rowid, {_fts_columns}) VALUES ('delete', old.id, {_fts_old}); "
+    f"INSERT INTO contacts_fts(rowid, {_fts_columns}) VALUES (new.id, {_fts_new}); END",
+]
+
+# users.contacts_version is bumped by triggers in the same statement as the
+# contacts write, so the repository writes stay a single round trip.
+CONTACTS_VERSION_SQLITE_DDL = [
+    "CREATE TRIGGER IF NOT EXISTS contacts_version_ai AFTER INSERT ON contacts BEGIN "
+    "UPDATE users SET contacts_version = contacts_version + 1 WHERE id = new.owner_id; END",
+    "CREATE TRIGGER IF NOT EXISTS contacts_version_ad AFTER DELETE ON contacts BEGIN "
+    "UPDATE users SET contacts_version = contacts_version + 1 WHERE id = old.owner_id; END",
+    "CREATE TRIGGER IF NOT EXISTS contacts_version_au AFTER UPDATE ON contacts BEGIN "
+    "UPDATE users SET contacts_version = contacts_version + 1 WHERE id IN (old.owner_id, new.owner_id); END",
+]
+
+# PostgreSQL bumps once per statement and owner using transition tables, so a
+# multi-row import or bulk update does not rewrite the users row for every contact.
+CONTACTS_VERSION_POSTGRESQL_DDL = [
+    """CREATE OR REPLACE FUNCTION contacts_bump_version() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE users SET contacts_version = contacts_version + 1
+        WHERE id IN (SELECT owner_id FROM new_rows);
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE users SET contacts_version = contacts_version + 1
+        WHERE id IN (SELECT owner_id FROM old_rows);
+    ELSE
+        UPDATE users SET contacts_version = contacts_version + 1
+        WHERE id IN (SELECT owner_id FROM old_rows UNION SELECT owner_id FROM new_rows);
+    END IF;
+    RETURN NULL;
+END $$""",
+    "CREATE TRIGGER contacts_version_ai AFTER INSERT ON contacts REFERENCING NEW TABLE AS new_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION contacts_bump_version()",
+    "CREATE TRIGGER contacts_version_ad AFTER DELETE ON contacts REFERENCING OLD TABLE AS old_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION contacts_bump_version()",
+    "CREATE TRIGGER contacts_version_au AFTER UPDATE ON contacts REFERENCING OLD TABLE AS old_rows "
+    "NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION contacts_bump_version()",
+]
+
+event.listen(Contact.__table__, "before_create",
+             DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"))
+for _statement in CONTACTS_FTS_DDL + CONTACTS_VERSION_SQLITE_DDL:
+    event.listen(Contact.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+for _statement in CONTACTS_VERSION_POSTGRESQL_DDL:
+    event.listen(Contact.__table__, "after_create", DDL(_statement).execute_if(dialect="postgresql"))
+for _remainder in range(CONTACTS_PARTITIONS):
+    event.listen(Contact.__table__, "after_create", DDL(
+        f"CREATE TABLE contacts_p{_remainder} PARTITION OF contacts "
+        f"FOR VALUES WITH (MODULUS {CONTACTS_PARTITIONS}, REMAINDER {_remainder})"
+    ).execute_if(dialect="postgresql"))
+event.listen(Contact.__table__, "before_drop",
+             DDL("DROP TABLE IF EXISTS contacts_fts").execute_if(dialect="sqlite"))
+event.listen(Contact.__table__, "after_drop",
+             DDL("DROP FUNCTION IF EXISTS contacts_bump_version()").execute_if(dialect="postgresql"))
+
 class User(Base):
     """
     Represents a user.
@@ -55,6 +167,8 @@ class User(Base):
         Verification status of the user.
     avatar_url : str, optional
         URL of the user's avatar.
+    contacts_version : int
+        Incremented on every change to the user's contacts; used for ETags.
     """
     __tablename__ = "users"
 
@@ -63,5 +177,50 @@ class User(Base):
     hashed_password = Column(String)
     is_verified = Column(Boolean, default=False)
     avatar_url = Column(String, nullable=True)
+    contacts_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     contacts = relationship("Contact", back_populates="owner")
+
+class EmailOutbox(Base):
+    """
+    Represents an email waiting to be delivered by the outbox worker.
+
+    Attributes:
+    -----------
+    id : int
+        Unique identifier for the message.
+    recipients : str
+        JSON list of recipient addresses.
+    subject : str
+        Subject of the message.
+    body : str
+        HTML body of the message.
+    status : str
+        One of "pending", "sent" or "failed".
+    attempts : int
+        Number of delivery attempts made so far.
+    next_attempt_at : datetime
+        The message is not picked up by the worker before this time.
+    last_error : str, optional
+        Error of the last failed attempt.
+    created_at : datetime
+        When the message was enqueued.
+    sent_at : datetime, optional
+        When the message was delivered.
+    """
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True)
+    recipients = Column(Text, nullable=False)
+    subject = Column(String, nullable=False)
+    body = Column(Text, nullable=False)
+    status = Column(String, nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.now)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.now)
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_email_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
@@ -0,0 +1,67 @@
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import FrozenSet, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+VERSIONS_DIR = Path(__file__).resolve().parents[2] / "alembic" / "versions"
+
+_revision = re.compile(r"^revision\b[^=]*=\s*['\"](\w+)['\"]", re.MULTILINE)
+_down_revision = re.compile(r"^down_revision\b[^=]*=\s*(.+)$", re.MULTILINE)
+_quoted = re.compile(r"['\"](\w+)['\"]")
+
+
+@lru_cache
+def migration_heads(versions_dir: Path = VERSIONS_DIR) -> FrozenSet[str]:
+    """
+    Return the head revisions of the Alembic migrations in ``versions_dir``.
+
+    The migration files are scanned as text instead of being loaded through
+    Alembic's ``ScriptDirectory``, which imports every migration module and
+    would cost a worker more at startup than the check itself.
+    """
+    revisions, parents = set(), set()
+    for path in versions_dir.glob("*.py"):
+        source = path.read_text(encoding="utf-8")
+        revision = _revision.search(source)
+        if revision is None:
+            continue
+        revisions.add(revision.group(1))
+        down_revision = _down_revision.search(source)
+        if down_revision is not None:
+            parents.update(_quoted.findall(down_revision.group(1)))
+    return frozenset(revisions - parents)
+
+
+async def current_revision(engine: AsyncEngine) -> Optional[str]:
+    """
+    Return the revision stamped in ``alembic_version``, None for an unmigrated database.
+    """
+    async with engine.connect() as conn:
+        try:
+            return (await conn.execute(text("SELECT version_num FROM alembic_version"))).scalar()
+        except DBAPIError:
+            return None
+
+
+async def check_schema(engine: AsyncEngine) -> str:
+    """
+    Make sure the database is migrated to the head revision of this code.
+
+    Raises:
+    -------
+    RuntimeError
+        If the database is not at the head, e.g. a new release started before
+        ``alembic upgrade head`` ran.
+    """
+    revision = await current_revision(engine)
+    heads = migration_heads()
+    if revision not in heads:
+        raise RuntimeError(
+            f"Database schema is at revision {revision}, the code expects {', '.join(sorted(heads))}; "
+            "run `alembic upgrade head`"
+        )
+    return revision
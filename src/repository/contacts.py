@@ -1,69 +1,381 @@
+import base64
+import calendar
+import json
+from typing import AsyncIterator
+from pydantic import ValidationError
+from sqlalchemy import case, column, delete, func, insert, literal_column, or_, table, tuple_, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import joinedload
-from src.database.models import Contact
+from src.database.models import Contact, User, get_birthday_key
 from src.schemas.schemas import ContactCreate, ContactUpdate
+from src.utils.cache import contacts_cache
 from datetime import date, timedelta
 
-async def get_contacts(db: AsyncSession, skip: int = 0, limit: int = 10, owner_id: int = 10):
-    result = await db.execute(
-        select(Contact).options(joinedload(Contact.owner)).where(Contact.owner_id == owner_id).offset(skip).limit(limit)
+CONTACT_COLUMNS = (
+    Contact.id, Contact.first_name, Contact.last_name, Contact.email,
+    Contact.phone_number, Contact.birthday, Contact.additional_info, Contact.owner_id,
+)
+
+CONTACT_ORDERINGS = {
+    "id": (Contact.id,),
+    "last_name": (Contact.last_name, Contact.first_name, Contact.id),
+}
+
+CONTACTS_MAX_LIMIT = 1000
+
+def _encode_cursor(order_by: str, row) -> str:
+    key = [row[column.key] for column in CONTACT_ORDERINGS[order_by]]
+    raw = json.dumps({"o": order_by, "k": key}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _decode_cursor(cursor: str, order_by: str) -> list:
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        key = data["k"]
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("Invalid cursor")
+    columns = CONTACT_ORDERINGS[order_by]
+    if data.get("o") != order_by or not isinstance(key, list) or len(key) != len(columns):
+        raise ValueError("Invalid cursor")
+    for value, column in zip(key, columns):
+        if value is None and column.nullable:
+            continue
+        if isinstance(value, bool) or not isinstance(value, column.type.python_type):
+            raise ValueError("Invalid cursor")
+    return key
+
+async def get_contacts_version(db: AsyncSession, owner_id: int) -> str:
+    """
+    Return the owner's contacts version token for ETags, which changes with every contact write.
+
+    ``users.contacts_version`` is bumped by triggers on the contacts table, so the
+    writes below never touch it themselves.
+
+    The token is ``"g<generation>"`` with the query cache generation when Redis is
+    available, so validating a conditional request does not need the database;
+    otherwise it is ``"v<counter>"`` with the ``users.contacts_version`` counter.
+    The prefixes keep the two sources from producing the same token.
+    """
+    generation = await contacts_cache.generation(owner_id)
+    if generation is not None:
+        return f"g{generation}"
+    result = await db.execute(select(User.contacts_version).where(User.id == owner_id))
+    return f"v{result.scalar() or 0}"
+
+# Read paths select only CONTACT_COLUMNS and return row mappings instead of ORM
+# objects: no owner join, no identity map and no per-row object construction.
+# Their results go through contacts_cache, whose generation every write below
+# replaces right after its commit.
+
+async def _fetch_all(db: AsyncSession, stmt) -> list:
+    result = await db.execute(stmt)
+    return result.mappings().all()
+
+async def get_contacts(db: AsyncSession, skip: int = 0, limit: int = 10, owner_id: int = 10, order_by: str = "id"):
+    stmt = (
+        select(*CONTACT_COLUMNS).where(Contact.owner_id == owner_id)
+        .order_by(*CONTACT_ORDERINGS[order_by]).offset(skip).limit(limit)
+    )
+    return await contacts_cache.get_or_load(
+        owner_id, "list", (skip, limit, order_by), lambda: _fetch_all(db, stmt)
+    )
+
+async def get_contacts_page(db: AsyncSession, owner_id: int, limit: int = 10, cursor: str = None, order_by: str = "id"):
+    """
+    Return one keyset-paginated page of contacts and the cursor of the next page.
+
+    The page is read with an index range scan on ``(owner_id, <ordering>)`` that
+    starts right after the cursor, so the cost does not grow with the page depth.
+    Raises ValueError if the cursor is malformed or was issued for another ordering.
+    """
+    columns = CONTACT_ORDERINGS[order_by]
+    stmt = select(*CONTACT_COLUMNS).where(Contact.owner_id == owner_id)
+    if cursor is not None:
+        stmt = stmt.where(tuple_(*columns) > tuple_(*_decode_cursor(cursor, order_by)))
+    stmt = stmt.order_by(*columns).limit(limit + 1)
+    contacts = await contacts_cache.get_or_load(
+        owner_id, "page", (limit, cursor, order_by), lambda: _fetch_all(db, stmt)
     )
-    return result.scalars().all()
+    next_cursor = None
+    if len(contacts) > limit:
+        contacts = contacts[:limit]
+        next_cursor = _encode_cursor(order_by, contacts[-1])
+    return contacts, next_cursor
+
+# Writes are a single owner-scoped statement whose RETURNING clause provides
+# the response row, so there is no SELECT before or refresh after the write.
+
+def _contact_values(contact) -> dict:
+    values = contact.model_dump()
+    values["birthday_key"] = get_birthday_key(contact.birthday)
+    return values
 
 async def create_contact(db: AsyncSession, contact: ContactCreate, owner_id: int):
-    db_contact = Contact(**contact.model_dump(), owner_id=owner_id)
-    db.add(db_contact)
+    result = await db.execute(
+        insert(Contact).values(**_contact_values(contact), owner_id=owner_id).returning(*CONTACT_COLUMNS)
+    )
+    db_contact = result.mappings().one()
     await db.commit()
-    await db.refresh(db_contact)
+    await contacts_cache.invalidate(owner_id)
     return db_contact
 
-async def get_contact(db: AsyncSession, contact_id: int):
-    result = await db.execute(select(Contact).where(Contact.id == contact_id))
+def _validation_message(err: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in err.errors())
+
+# SQLite's default limit of bound parameters per statement; asyncpg allows 32767.
+MAX_BIND_PARAMETERS = 32766
+
+async def _insert_rows(db: AsyncSession, rows: list):
+    """
+    Insert ``rows`` with multi-row ``INSERT ... VALUES`` statements.
+
+    Passing a list of parameter sets to ``execute`` would run an executemany
+    of single-row INSERTs on aiosqlite and on asyncpg without RETURNING; a
+    statement built with ``values(rows)`` sends the whole chunk at once. Rows
+    are split so that no statement exceeds ``MAX_BIND_PARAMETERS``.
+    """
+    per_statement = max(1, MAX_BIND_PARAMETERS // len(rows[0]))
+    for start in range(0, len(rows), per_statement):
+        await db.execute(insert(Contact).values(rows[start:start + per_statement]))
+
+async def _insert_batch(db: AsyncSession, batch: list, result: dict, max_errors: int, owner_id: int):
+    try:
+        await _insert_rows(db, [values for _, values in batch])
+        await db.commit()
+        await contacts_cache.invalidate(owner_id)
+        result["imported"] += len(batch)
+        return
+    except IntegrityError:
+        await db.rollback()
+    # Something in the batch violates a constraint: retry row by row to find it.
+    for row, values in batch:
+        try:
+            await db.execute(insert(Contact).values(values))
+            await db.commit()
+            await contacts_cache.invalidate(owner_id)
+            result["imported"] += 1
+        except IntegrityError as err:
+            await db.rollback()
+            _add_import_error(result, row, _integrity_message(err), max_errors)
+
+def _integrity_message(err: IntegrityError) -> str:
+    """
+    Name the constraint a row violated, from the driver's message.
+
+    SQLite says e.g. ``UNIQUE constraint failed: contacts.email``, PostgreSQL
+    names the constraint, e.g. ``ix_contacts_email`` or ``contacts_owner_id_fkey``.
+    """
+    detail = str(err.orig).splitlines()[0]
+    lowered = detail.lower()
+    if "email" in lowered and ("unique" in lowered or "duplicate" in lowered):
+        return "Contact with this email already exists"
+    if "foreign key" in lowered or "owner_id_fkey" in lowered:
+        return "Owner does not exist"
+    return f"Constraint violated: {detail}"
+
+def _add_import_error(result: dict, row: int, error: str, max_errors: int):
+    result["failed"] += 1
+    if len(result["errors"]) < max_errors:
+        result["errors"].append({"row": row, "error": error})
+
+async def import_contacts(db: AsyncSession, records: AsyncIterator, owner_id: int, batch_size: int = 1000, max_errors: int = 100):
+    """
+    Validate and insert a stream of ``(row number, record)`` pairs in batches.
+
+    Each batch is written with one multi-row INSERT in its own transaction, so a
+    bad row only costs its batch a row-by-row retry and never aborts the load.
+    At most ``max_errors`` per-row errors are reported; ``failed`` counts all of them.
+    """
+    result = {"imported": 0, "failed": 0, "errors": []}
+    batch = []
+    async for row, record in records:
+        if isinstance(record, Exception):
+            _add_import_error(result, row, str(record), max_errors)
+            continue
+        try:
+            contact = ContactCreate.model_validate(record)
+        except ValidationError as err:
+            _add_import_error(result, row, _validation_message(err), max_errors)
+            continue
+        values = _contact_values(contact)
+        values["owner_id"] = owner_id
+        batch.append((row, values))
+        if len(batch) >= batch_size:
+            await _insert_batch(db, batch, result, max_errors, owner_id)
+            batch = []
+    if batch:
+        await _insert_batch(db, batch, result, max_errors, owner_id)
+    return result
+
+async def stream_contacts(db: AsyncSession, owner_id: int, chunk_size: int = 1000):
+    """
+    Yield all contacts of an owner as lists of row mappings, ``chunk_size`` rows at a time.
+
+    Rows are fetched through a server-side cursor, so memory does not depend on
+    the size of the address book.
+    """
+    result = await db.stream(
+        select(*CONTACT_COLUMNS).where(Contact.owner_id == owner_id).order_by(Contact.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    async for partition in result.mappings().partitions():
+        yield partition
+
+async def get_contact(db: AsyncSession, contact_id: int, owner_id: int):
+    """
+    Return a contact of ``owner_id``, or None if no such contact is owned by it.
+
+    Like every query of this module it filters on ``owner_id``, which lets
+    PostgreSQL prune a hash-partitioned ``contacts`` table to one partition.
+    """
+    result = await db.execute(select(Contact).where(Contact.id == contact_id, Contact.owner_id == owner_id))
     return result.scalars().first()
 
 async def update_contact(db: AsyncSession, contact_id: int, contact: ContactUpdate, owner_id: int):
-    db_contact = await get_contact(db, contact_id)
-    if db_contact is None or db_contact.owner_id != owner_id:
-        return None
-    for key, value in contact.model_dump().items():
-        setattr(db_contact, key, value)
-    db.add(db_contact)
+    """
+    Replace a contact of ``owner_id``; returns None if no such contact is owned by it.
+    """
+    result = await db.execute(
+        update(Contact).where(Contact.id == contact_id, Contact.owner_id == owner_id)
+        .values(**_contact_values(contact)).returning(*CONTACT_COLUMNS)
+        .execution_options(synchronize_session=False)
+    )
+    db_contact = result.mappings().first()
     await db.commit()
-    await db.refresh(db_contact)
+    if db_contact is not None:
+        await contacts_cache.invalidate(owner_id)
     return db_contact
 
 async def delete_contact(db: AsyncSession, contact_id: int, owner_id: int):
-    db_contact = await get_contact(db, contact_id)
-    if db_contact is None or db_contact.owner_id != owner_id:
-        return None
-    await db.delete(db_contact)
+    """
+    Delete a contact of ``owner_id``; returns the deleted row, or None if no such contact is owned by it.
+    """
+    result = await db.execute(
+        delete(Contact).where(Contact.id == contact_id, Contact.owner_id == owner_id)
+        .returning(*CONTACT_COLUMNS).execution_options(synchronize_session=False)
+    )
+    db_contact = result.mappings().first()
     await db.commit()
+    if db_contact is not None:
+        await contacts_cache.invalidate(owner_id)
     return db_contact
 
-async def search_contacts(db: AsyncSession, query: str, owner_id: int):
+async def bulk_update_contacts(db: AsyncSession, ids: list, changes: dict, owner_id: int) -> set:
+    """
+    Apply the same ``changes`` to all contacts of ``ids`` owned by ``owner_id``.
+
+    All rows are changed by one set-based UPDATE in a single transaction; ids that
+    do not exist or belong to another owner are left alone.
+
+    Returns:
+    --------
+    set
+        Ids of the updated contacts.
+    """
+    values = dict(changes)
+    if "birthday" in values:
+        values["birthday_key"] = get_birthday_key(values["birthday"])
     result = await db.execute(
-        select(Contact).options(joinedload(Contact.owner))
-        .where(
-            (Contact.owner_id == owner_id) &
-            (
-                Contact.first_name.contains(query) |
-                Contact.last_name.contains(query) |
-                Contact.email.contains(query)
-            )
-        )
+        update(Contact).where(Contact.owner_id == owner_id, Contact.id.in_(ids)).values(**values)
+        .returning(Contact.id).execution_options(synchronize_session=False)
     )
-    return result.scalars().all()
+    updated = set(result.scalars().all())
+    await db.commit()
+    if updated:
+        await contacts_cache.invalidate(owner_id)
+    return updated
 
-async def get_upcoming_birthdays(db: AsyncSession, owner_id: int):
-    today = date.today()
-    next_week = today + timedelta(days=7)
+async def bulk_delete_contacts(db: AsyncSession, ids: list, owner_id: int) -> set:
+    """
+    Delete all contacts of ``ids`` owned by ``owner_id`` with one DELETE statement.
+
+    Returns:
+    --------
+    set
+        Ids of the deleted contacts.
+    """
     result = await db.execute(
-        select(Contact).options(joinedload(Contact.owner))
+        delete(Contact).where(Contact.owner_id == owner_id, Contact.id.in_(ids))
+        .returning(Contact.id).execution_options(synchronize_session=False)
+    )
+    deleted = set(result.scalars().all())
+    await db.commit()
+    if deleted:
+        await contacts_cache.invalidate(owner_id)
+    return deleted
+
+SEARCH_COLUMNS = (Contact.first_name, Contact.last_name, Contact.email, Contact.additional_info)
+SEARCH_MAX_LIMIT = 100
+
+_contacts_fts = table("contacts_fts", column("rowid"))
+_fts_document = literal_column("contacts_fts")
+
+def _like_pattern(query: str) -> str:
+    escaped = query.replace("/", "//").replace("%", "/%").replace("_", "/_")
+    return f"%{escaped}%"
+
+async def search_contacts(db: AsyncSession, query: str, owner_id: int, skip: int = 0, limit: int = 20):
+    """
+    Return the top ``limit`` contacts matching ``query``, best matches first.
+
+    PostgreSQL matches with ILIKE served by the pg_trgm GIN indexes and ranks by
+    trigram similarity; SQLite uses the ``contacts_fts`` FTS5 trigram table ranked
+    by bm25. Queries shorter than a trigram fall back to a plain substring scan.
+    """
+    limit = min(limit, SEARCH_MAX_LIMIT)
+    dialect = db.get_bind().dialect.name
+    stmt = select(*CONTACT_COLUMNS).where(Contact.owner_id == owner_id)
+    if dialect == "postgresql":
+        pattern = _like_pattern(query)
+        rank = func.greatest(*(func.similarity(column, query) for column in SEARCH_COLUMNS))
+        stmt = stmt.where(or_(*(column.ilike(pattern, escape="/") for column in SEARCH_COLUMNS)))
+        stmt = stmt.order_by(rank.desc(), Contact.id)
+    elif dialect == "sqlite" and len(query) >= 3:
+        fts_query = '"' + query.replace('"', '""') + '"'
+        stmt = stmt.join(_contacts_fts, _contacts_fts.c.rowid == Contact.id)
+        stmt = stmt.where(_fts_document.op("MATCH")(fts_query))
+        stmt = stmt.order_by(func.bm25(_fts_document), Contact.id)
+    else:
+        stmt = stmt.where(or_(*(column.contains(query, autoescape=True) for column in SEARCH_COLUMNS)))
+        stmt = stmt.order_by(Contact.id)
+    stmt = stmt.offset(skip).limit(limit)
+    return await contacts_cache.get_or_load(
+        owner_id, "search", (query, skip, limit), lambda: _fetch_all(db, stmt)
+    )
+
+def _birthday_key_ranges(today: date, days: int) -> list:
+    """
+    Translate the window ``today .. today + days`` into inclusive ``birthday_key`` ranges.
+
+    A window crossing New Year is split in two. Contacts born on February 29 are
+    congratulated on February 28 in non-leap years.
+    """
+    if days >= 365:
+        return [(101, 1231)]
+    end = today + timedelta(days=days)
+    start_key, end_key = get_birthday_key(today), get_birthday_key(end)
+    if end_key == 228 and not calendar.isleap(end.year):
+        end_key = 229
+    if end.year == today.year:
+        return [(start_key, end_key)]
+    return [(start_key, 1231), (101, end_key)]
+
+async def get_upcoming_birthdays(db: AsyncSession, owner_id: int, days: int = 7, today: date = None):
+    today = today or date.today()
+    ranges = _birthday_key_ranges(today, days)
+    stmt = (
+        select(*CONTACT_COLUMNS)
         .where(
             (Contact.owner_id == owner_id) &
-            (Contact.birthday >= today) &
-            (Contact.birthday <= next_week)
+            or_(*(Contact.birthday_key.between(low, high) for low, high in ranges))
+        )
+        .order_by(
+            case((Contact.birthday_key < get_birthday_key(today), 1), else_=0),
+            Contact.birthday_key,
+            Contact.id,
         )
     )
-    return result.scalars().all()
+    return await contacts_cache.get_or_load(
+        owner_id, "birthdays", (days, today.isoformat()), lambda: _fetch_all(db, stmt)
+    )
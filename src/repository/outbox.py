@@ -0,0 +1,118 @@
+import json
+from datetime import datetime, timedelta
+from typing import List, Optional
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from src.database.models import EmailOutbox
+
+async def enqueue_email(db: AsyncSession, recipients: List[str], subject: str, body: str):
+    """
+    Add an email to the outbox.
+
+    The message is only added to the session, so it is committed atomically
+    with whatever the caller commits next.
+
+    Parameters:
+    -----------
+    db : AsyncSession
+        Database session.
+    recipients : List[str]
+        Recipient addresses.
+    subject : str
+        Subject of the message.
+    body : str
+        HTML body of the message.
+
+    Returns:
+    --------
+    EmailOutbox
+        The pending outbox message.
+    """
+    message = EmailOutbox(recipients=json.dumps(recipients), subject=subject, body=body)
+    db.add(message)
+    return message
+
+async def claim_due_emails(db: AsyncSession, limit: int, lease_seconds: float) -> List[dict]:
+    """
+    Claim up to ``limit`` pending emails that are due for delivery.
+
+    Claimed messages get their ``next_attempt_at`` pushed ``lease_seconds`` into the
+    future, so other workers skip them; if this worker dies they become due again.
+
+    Parameters:
+    -----------
+    db : AsyncSession
+        Database session.
+    limit : int
+        Maximum number of messages to claim.
+    lease_seconds : float
+        How long the claim is held.
+
+    Returns:
+    --------
+    List[dict]
+        The claimed messages as plain dictionaries.
+    """
+    now = datetime.now()
+    result = await db.execute(
+        select(EmailOutbox)
+        .where((EmailOutbox.status == "pending") & (EmailOutbox.next_attempt_at <= now))
+        .order_by(EmailOutbox.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    claimed = []
+    for message in result.scalars().all():
+        message.next_attempt_at = now + timedelta(seconds=lease_seconds)
+        claimed.append({
+            "id": message.id,
+            "recipients": json.loads(message.recipients),
+            "subject": message.subject,
+            "body": message.body,
+            "attempts": message.attempts,
+        })
+    await db.commit()
+    return claimed
+
+async def mark_sent(db: AsyncSession, message_ids: List[int]):
+    """
+    Mark messages as delivered.
+
+    Parameters:
+    -----------
+    db : AsyncSession
+        Database session.
+    message_ids : List[int]
+        IDs of the delivered messages.
+    """
+    if not message_ids:
+        return
+    await db.execute(
+        update(EmailOutbox).where(EmailOutbox.id.in_(message_ids))
+        .values(status="sent", sent_at=datetime.now(), attempts=EmailOutbox.attempts + 1, last_error=None)
+    )
+    await db.commit()
+
+async def mark_failed(db: AsyncSession, message_id: int, error: str, retry_at: Optional[datetime]):
+    """
+    Record a failed delivery attempt.
+
+    Parameters:
+    -----------
+    db : AsyncSession
+        Database session.
+    message_id : int
+        ID of the message.
+    error : str
+        Description of the failure.
+    retry_at : datetime, optional
+        When to try again, or None to give up on the message.
+    """
+    values = {"attempts": EmailOutbox.attempts + 1, "last_error": error}
+    if retry_at is None:
+        values["status"] = "failed"
+    else:
+        values["next_attempt_at"] = retry_at
+    await db.execute(update(EmailOutbox).where(EmailOutbox.id == message_id).values(**values))
+    await db.commit()
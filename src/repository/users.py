@@ -1,8 +1,10 @@
+from sqlalchemy import insert, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from src.database.models import User
 from src.schemas.schemas import UserCreate
-from src.utils.password import get_password_hash
+from src.utils.cache import user_cache
+from src.utils.password import get_password_hash_async
 
 async def get_user_by_email(db: AsyncSession, email: str):
     """
@@ -39,10 +41,66 @@ async def create_user(db: AsyncSession, user: UserCreate):
     User
         The created user object.
     """
-    hashed_password = get_password_hash(user.password)
-    db_user = User(email=user.email, hashed_password=hashed_password)
-    db.add(db_user)
+    hashed_password = await get_password_hash_async(user.password)
+    result = await db.execute(
+        insert(User).values(email=user.email, hashed_password=hashed_password).returning(User)
+    )
+    db_user = result.scalars().one()
     await db.commit()
-    await db.refresh(db_user)
     return db_user
 
+async def confirm_email(db: AsyncSession, email: str):
+    """
+    Mark a user's email address as verified.
+
+    Parameters:
+    -----------
+    db : AsyncSession
+        Database session.
+    email : str
+        Email address of the user.
+
+    Returns:
+    --------
+    User
+        The updated user object if found, otherwise None.
+    """
+    result = await db.execute(
+        update(User).where(User.email == email).values(is_verified=True).returning(User)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
+    user = result.scalars().first()
+    await db.commit()
+    if user is None:
+        return None
+    await user_cache.invalidate(email)
+    return user
+
+async def update_avatar(db: AsyncSession, email: str, url: str):
+    """
+    Update the avatar URL of a user.
+
+    Parameters:
+    -----------
+    db : AsyncSession
+        Database session.
+    email : str
+        Email address of the user.
+    url : str
+        The new avatar URL.
+
+    Returns:
+    --------
+    User
+        The updated user object if found, otherwise None.
+    """
+    result = await db.execute(
+        update(User).where(User.email == email).values(avatar_url=url).returning(User)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
+    user = result.scalars().first()
+    await db.commit()
+    if user is None:
+        return None
+    await user_cache.invalidate(email)
+    return user
@@ -3,11 +3,13 @@ from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 from src.database.db import get_db
-from src.schemas.schemas import UserCreate, User, Token, UserBase
-from src.repository import users
+from src.schemas.schemas import UserCreate, User, Token
+from src.repository import users, outbox
 from src.utils.utils import create_access_token, create_refresh_token, authenticate_user, get_current_user, decode_token
-from src.utils.cloudinary import upload_image
-from src.utils.email import EmailSchema, send_email
+from src.utils.avatar import process_avatar
+from src.utils.storage import StorageBackend, get_storage
+from src.utils.email import outbox_worker
+from src.utils.rate_limit import RateLimit
 
 import logging
 
@@ -15,13 +17,15 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(
     prefix="/auth",
-    tags=["auth"]
+    tags=["auth"],
+    dependencies=[Depends(RateLimit("auth"))],
 )
 
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 REFRESH_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
 
-@router.post("/register/", response_model=User, status_code=status.HTTP_201_CREATED)
+@router.post("/register/", response_model=User, status_code=status.HTTP_201_CREATED,
+             dependencies=[Depends(RateLimit("auth.register"))])
 async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
     """
     Register a new user.
@@ -43,13 +47,15 @@ async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
     if db_user:
         logger.warning(f"Email already registered: {user.email}")
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Email already registered")
-    new_user = await users.create_user(db=db, user=user)
     verification_url = f"http://http://127.0.0.1:8000/verify?token={create_access_token({'sub': user.email})}"
-    email = EmailSchema(email=[user.email])
-    await send_email(email, "Verify your email", f"Please click the link to verify your email: {verification_url}")
+    # Enqueued first so that the message is committed together with the new user.
+    await outbox.enqueue_email(db, [user.email], "Verify your email",
+                               f"Please click the link to verify your email: {verification_url}")
+    new_user = await users.create_user(db=db, user=user)
+    outbox_worker.notify()
     return new_user
 
-@router.post("/login/", response_model=Token)
+@router.post("/login/", response_model=Token, dependencies=[Depends(RateLimit("auth.login"))])
 async def login(body: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
     """
     Authenticate a user and return a JWT token.
@@ -113,16 +119,14 @@ async def verify_email(token: str, db: AsyncSession = Depends(get_db)):
         A message indicating the result of the verification.
     """
     email = decode_token(token)
-    user = await users.get_user_by_email(db, email=email)
+    user = await users.confirm_email(db, email=email)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-    user.is_verified = True
-    db.add(user)
-    await db.commit()
     return {"message": "Email verified successfully"}
 
 @router.post("/upload-avatar/")
-async def upload_avatar(file: UploadFile = File(...), current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+async def upload_avatar(file: UploadFile = File(...), current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db),
+                        storage: StorageBackend = Depends(get_storage)):
     """
     Upload an avatar for the current user.
 
@@ -134,23 +138,15 @@ async def upload_avatar(file: UploadFile = File(...), current_user: User = Depen
         The current authenticated user.
     db : AsyncSession
         Database session.
+    storage : StorageBackend
+        Where the resized avatar images are stored.
 
     Returns:
     --------
     dict
         The URL of the uploaded avatar.
     """
-    url = upload_image(file.file)
-    current_user.avatar_url = url
-    db.add(current_user)
-    await db.commit()
+    url = await process_avatar(file, storage)
+    await users.update_avatar(db, email=current_user.email, url=url)
     return {"avatar_url": url}
 
-
-# @router.post("/send_verify_email")
-# async def send_verify_email(user: UserBase):
-#     verification_url = f"http://http://127.0.0.1:8000/verify?token={create_access_token({'sub': user.email})}"
-#     email = EmailSchema(email=[user.email])
-#     await send_email(email, "Verify your email", f"Please click the link to verify your email: {verification_url}")
-#     message = "Check your email for confirmation."
-#     return message
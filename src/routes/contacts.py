@@ -1,30 +1,128 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
-from src.database.db import get_db
-from src.schemas.schemas import ContactCreate, ContactUpdate, Contact as ContactSchema
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from datetime import date
+from typing import List, Literal, Optional
+from src.database.db import get_db, get_session_maker
+from src.config.settings import settings
+from src.schemas.schemas import (
+    ContactCreate, ContactUpdate, Contact as ContactSchema, ContactImportResult,
+    ContactBulkDelete, ContactBulkResult, ContactBulkUpdate,
+)
 import src.repository.contacts as crud
-from src.utils.utils import get_current_user
+from src.utils.responses import contacts_response, etag_matches, make_etag, negotiate_media_type, not_modified
+from src.utils.contacts_io import RecordTooLong, encode_csv, encode_ndjson, iter_csv, iter_ndjson
+from src.utils.rate_limit import UserRateLimit
+from src.utils.utils import get_current_user, get_read_db
 from src.database.models import User
 
 router = APIRouter(
     prefix="/contacts",
-    tags=["contacts"]
+    tags=["contacts"],
+    dependencies=[Depends(UserRateLimit("contacts"))],
 )
 
+def bulk_result(ids: list, changed: set, status: str) -> dict:
+    ids = list(dict.fromkeys(ids))
+    return {
+        "processed": len(changed),
+        "results": [{"id": contact_id, "status": status if contact_id in changed else "not_found"} for contact_id in ids],
+    }
+
+async def contacts_etag(request: Request, db: AsyncSession, owner_id: int, *parts) -> str:
+    version = await crud.get_contacts_version(db, owner_id)
+    return make_etag(request, owner_id, version, negotiate_media_type(request), *parts)
+
 @router.post("/", response_model=ContactSchema, status_code=201)
 async def create_contact(contact: ContactCreate, db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
     return await crud.create_contact(db=db, contact=contact, owner_id=current_user.id)
 
+@router.post("/import", response_model=ContactImportResult)
+async def import_contacts(request: Request, format: Optional[Literal["csv", "ndjson"]] = None,
+                          db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
+    if format is None:
+        format = "csv" if "csv" in request.headers.get("content-type", "") else "ndjson"
+    parse = iter_csv if format == "csv" else iter_ndjson
+    try:
+        return await crud.import_contacts(
+            db=db, records=parse(request.stream(), settings.import_max_record_length), owner_id=current_user.id,
+            batch_size=settings.import_batch_size, max_errors=settings.import_max_errors,
+        )
+    except RecordTooLong as err:
+        # Batches committed before the oversized record stay imported.
+        raise HTTPException(status_code=413, detail=str(err))
+
 @router.get("/", response_model=List[ContactSchema])
-async def read_contacts(skip: int = 0, limit: int = 10, db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
-    return await crud.get_contacts(db=db, skip=skip, limit=limit, owner_id=current_user.id)
+async def read_contacts(request: Request, skip: int = Query(0, ge=0), limit: int = Query(10, ge=1, le=crud.CONTACTS_MAX_LIMIT),
+                        cursor: Optional[str] = None,
+                        order_by: Literal["id", "last_name"] = "id",
+                        db: AsyncSession = Depends(get_read_db), current_user: User = Depends(get_current_user)):
+    etag = await contacts_etag(request, db, current_user.id)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    headers = {"ETag": etag}
+    if skip and cursor is None:
+        return contacts_response(
+            await crud.get_contacts(db=db, skip=skip, limit=limit, owner_id=current_user.id, order_by=order_by),
+            headers=headers, request=request,
+        )
+    try:
+        contacts, next_cursor = await crud.get_contacts_page(
+            db=db, owner_id=current_user.id, limit=limit, cursor=cursor, order_by=order_by
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    return contacts_response(contacts, headers=headers, request=request)
+
+@router.get("/export")
+async def export_contacts(format: Literal["ndjson", "csv"] = "ndjson",
+                          session_maker: async_sessionmaker = Depends(get_session_maker),
+                          current_user: User = Depends(get_current_user)):
+    owner_id = current_user.id
+
+    async def body():
+        async with session_maker() as session:
+            chunks = crud.stream_contacts(session, owner_id=owner_id, chunk_size=settings.export_chunk_size)
+            if format == "csv":
+                encoded = encode_csv(chunks, [column.key for column in crud.CONTACT_COLUMNS])
+            else:
+                encoded = encode_ndjson(chunks)
+            async for data in encoded:
+                yield data
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(body(), media_type=media_type,
+                             headers={"Content-Disposition": f'attachment; filename="contacts.{format}"'})
+
+@router.patch("/bulk", response_model=ContactBulkResult)
+async def bulk_update_contacts(body: ContactBulkUpdate, db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
+    changes = body.changes.model_dump(exclude_unset=True)
+    if not changes:
+        raise HTTPException(status_code=400, detail="No changes given")
+    try:
+        updated = await crud.bulk_update_contacts(db, body.ids, changes, owner_id=current_user.id)
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Contact with this email already exists")
+    return bulk_result(body.ids, updated, "updated")
+
+@router.delete("/bulk", response_model=ContactBulkResult)
+async def bulk_delete_contacts(body: ContactBulkDelete, db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
+    deleted = await crud.bulk_delete_contacts(db, body.ids, owner_id=current_user.id)
+    return bulk_result(body.ids, deleted, "deleted")
 
 @router.get("/{contact_id}", response_model=ContactSchema)
-async def read_contact(contact_id: int, db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
-    db_contact = await crud.get_contact(db, contact_id)
-    if db_contact is None or db_contact.owner_id != current_user.id:
+async def read_contact(contact_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_read_db), current_user: User = Depends(get_current_user)):
+    etag = await contacts_etag(request, db, current_user.id)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    db_contact = await crud.get_contact(db, contact_id, owner_id=current_user.id)
+    if db_contact is None:
         raise HTTPException(status_code=404, detail="Contact not found")
+    response.headers["ETag"] = etag
     return db_contact
 
 @router.put("/{contact_id}", response_model=ContactSchema)
@@ -42,9 +140,23 @@ async def delete_contact(contact_id: int, db: AsyncSession = Depends(get_db), cu
     return db_contact
 
 @router.get("/search/", response_model=List[ContactSchema])
-async def search_contacts(query: str, db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
-    return await crud.search_contacts(db=db, query=query, owner_id=current_user.id)
+async def search_contacts(request: Request, query: str, skip: int = Query(0, ge=0), limit: int = Query(20, ge=1, le=crud.SEARCH_MAX_LIMIT),
+                          db: AsyncSession = Depends(get_read_db), current_user: User = Depends(get_current_user)):
+    etag = await contacts_etag(request, db, current_user.id)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return contacts_response(
+        await crud.search_contacts(db=db, query=query, owner_id=current_user.id, skip=skip, limit=limit),
+        headers={"ETag": etag}, request=request,
+    )
 
 @router.get("/upcoming-birthdays/", response_model=List[ContactSchema])
-async def upcoming_birthdays(db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
-    return await crud.get_upcoming_birthdays(db=db, owner_id=current_user.id)
+async def upcoming_birthdays(request: Request, days: int = Query(7, ge=0, le=365), db: AsyncSession = Depends(get_read_db), current_user: User = Depends(get_current_user)):
+    today = date.today()
+    etag = await contacts_etag(request, db, current_user.id, today.isoformat())
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return contacts_response(
+        await crud.get_upcoming_birthdays(db=db, owner_id=current_user.id, days=days, today=today),
+        headers={"ETag": etag}, request=request,
+    )
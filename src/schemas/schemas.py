@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr, ConfigDict
-from typing import Optional
+from pydantic import BaseModel, EmailStr, ConfigDict, Field, field_validator
+from typing import List, Literal, Optional
 from datetime import date
 
 class ContactBase(BaseModel):
@@ -22,6 +22,46 @@ class Contact(ContactBase):
 
     model_config = ConfigDict(from_attributes = True)
 
+class ContactImportError(BaseModel):
+    row: int
+    error: str
+
+class ContactImportResult(BaseModel):
+    imported: int
+    failed: int
+    errors: List[ContactImportError]
+
+BULK_MAX_IDS = 1000
+
+class ContactPatch(BaseModel):
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    email: Optional[EmailStr] = None
+    phone_number: Optional[str] = None
+    birthday: Optional[date] = None
+    additional_info: Optional[str] = None
+
+    @field_validator("first_name", "last_name", "email", "phone_number", "birthday")
+    @classmethod
+    def not_null(cls, value):
+        if value is None:
+            raise ValueError("may be omitted but not null")
+        return value
+
+class ContactBulkDelete(BaseModel):
+    ids: List[int] = Field(min_length=1, max_length=BULK_MAX_IDS)
+
+class ContactBulkUpdate(ContactBulkDelete):
+    changes: ContactPatch
+
+class ContactBulkItem(BaseModel):
+    id: int
+    status: Literal["updated", "deleted", "not_found"]
+
+class ContactBulkResult(BaseModel):
+    processed: int
+    results: List[ContactBulkItem]
+
 
 class UserBase(BaseModel):
     email: EmailStr
@@ -0,0 +1,134 @@
+import asyncio
+import hashlib
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException, UploadFile, status
+from fastapi.responses import JSONResponse
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from src.config.settings import settings
+from src.utils.cache import TTLCache
+from src.utils.storage import StorageBackend
+
+AVATAR_SIZES = (256, 128, 64)
+CHUNK_SIZE = 64 * 1024
+UPLOAD_PATH = "/auth/upload-avatar"
+# Room for the multipart boundaries and part headers around the file itself.
+MULTIPART_OVERHEAD = 16 * 1024
+
+avatar_executor = ThreadPoolExecutor(max_workers=settings.avatar_workers, thread_name_prefix="avatar")
+_known_digests = TTLCache(maxsize=4096, ttl=3600)
+
+
+async def read_limited(file: UploadFile, max_bytes: int) -> bytes:
+    """
+    Read an upload chunk by chunk, rejecting it with 413 once it exceeds ``max_bytes``.
+    """
+    buffer = bytearray()
+    while chunk := await file.read(CHUNK_SIZE):
+        buffer += chunk
+        if len(buffer) > max_bytes:
+            raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Avatar is too large")
+    return bytes(buffer)
+
+
+class AvatarSizeLimitMiddleware:
+    """
+    Pure ASGI middleware rejecting oversized avatar uploads before their body is parsed.
+
+    The multipart parser spools the whole body before the route runs, so
+    ``read_limited`` alone would still accept an arbitrarily large transfer.
+    A ``Content-Length`` above the limit is answered with 413 at once, and a
+    body without one is cut off with 413 as soon as it passes the limit.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].rstrip("/") != UPLOAD_PATH:
+            await self.app(scope, receive, send)
+            return
+        limit = settings.avatar_max_bytes + MULTIPART_OVERHEAD
+        length = dict(scope["headers"]).get(b"content-length")
+        if length is not None and length.isdigit() and int(length) > limit:
+            response = JSONResponse({"detail": "Avatar is too large"},
+                                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+            await response(scope, receive, send)
+            return
+        received = 0
+
+        async def receive_limited():
+            nonlocal received
+            message = await receive()
+            received += len(message.get("body", b""))
+            if received > limit:
+                raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Avatar is too large")
+            return message
+
+        await self.app(scope, receive_limited, send)
+
+
+def render_avatars(data: bytes, max_pixels: int) -> dict:
+    """
+    Decode an image and re-encode it as square WebP thumbnails of every size in ``AVATAR_SIZES``.
+
+    Raises ValueError if the data is not an image or has more than ``max_pixels`` pixels.
+    """
+    try:
+        image = Image.open(io.BytesIO(data))
+    except UnidentifiedImageError:
+        raise ValueError("Unsupported image format")
+    if image.width * image.height > max_pixels:
+        raise ValueError("Image dimensions are too large")
+    image = ImageOps.exif_transpose(image)
+    image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+    renditions = {}
+    for size in AVATAR_SIZES:
+        output = io.BytesIO()
+        ImageOps.fit(image, (size, size), Image.LANCZOS).save(output, format="WEBP", quality=85)
+        renditions[size] = output.getvalue()
+    return renditions
+
+
+def avatar_key(digest: str, size: int) -> str:
+    return f"avatars/{digest}/{size}.webp"
+
+
+async def process_avatar(file: UploadFile, storage: StorageBackend) -> str:
+    """
+    Validate, resize and store an uploaded avatar.
+
+    Uploads are deduplicated by the SHA-256 of their content: an image that is
+    already stored is neither decoded nor uploaded again.
+
+    Parameters:
+    -----------
+    file : UploadFile
+        The uploaded image.
+    storage : StorageBackend
+        Where the renditions are stored.
+
+    Returns:
+    --------
+    str
+        URL of the largest rendition.
+    """
+    data = await read_limited(file, settings.avatar_max_bytes)
+    digest = hashlib.sha256(data).hexdigest()
+    key = avatar_key(digest, AVATAR_SIZES[0])
+    if _known_digests.get(digest) or await storage.exists(key):
+        _known_digests.set(digest, True)
+        return storage.url(key)
+    try:
+        renditions = await asyncio.get_running_loop().run_in_executor(
+            avatar_executor, render_avatars, data, settings.avatar_max_pixels
+        )
+    except (ValueError, OSError, Image.DecompressionBombError) as err:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(err))
+    urls = await asyncio.gather(*(
+        storage.save(avatar_key(digest, size), body, "image/webp") for size, body in renditions.items()
+    ))
+    _known_digests.set(digest, True)
+    return urls[0]
@@ -0,0 +1,383 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+import orjson
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from src.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+redis_client: Optional[Redis] = None
+
+
+def set_redis(client: Optional[Redis]) -> None:
+    """
+    Register the shared Redis client created at application startup.
+
+    Parameters:
+    -----------
+    client : Redis, optional
+        The Redis client, or None to run with the in-process tier only.
+    """
+    global redis_client
+    redis_client = client
+
+
+class TTLCache:
+    """
+    A small in-process LRU cache whose entries expire after a fixed TTL.
+
+    Attributes:
+    -----------
+    maxsize : int
+        Maximum number of entries kept before the least recently used one is evicted.
+    ttl : float
+        Lifetime of an entry in seconds.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+
+    def get(self, key):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key, value) -> None:
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def delete(self, key) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class UserCache:
+    """
+    Two-tier cache of authenticated principals keyed by token subject (email).
+
+    The first tier is a per-process TTL/LRU cache, the second one is Redis so that
+    a user resolved by one worker is not fetched from the database by the others.
+    Invalidation only reaches the local tier of the current worker, so the local
+    TTL is kept short to bound staleness in the other workers.
+    Only the public user fields are cached, never the password hash.
+    """
+
+    prefix = "auth:user:"
+
+    def __init__(self, maxsize: int, local_ttl: int, ttl: int):
+        self.ttl = ttl
+        self.local = TTLCache(maxsize, local_ttl)
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    async def get(self, email: str) -> Optional[dict]:
+        """
+        Look up a cached user, first locally and then in Redis.
+
+        Parameters:
+        -----------
+        email : str
+            The token subject.
+
+        Returns:
+        --------
+        dict
+            The cached user fields, or None on a miss.
+        """
+        data = self.local.get(email)
+        if data is not None:
+            self.local_hits += 1
+            return data
+        if redis_client is not None:
+            try:
+                raw = await redis_client.get(self.prefix + email)
+            except RedisError as err:
+                logger.warning(f"User cache read failed: {err}")
+                raw = None
+            if raw is not None:
+                data = json.loads(raw)
+                self.local.set(email, data)
+                self.redis_hits += 1
+                return data
+        self.misses += 1
+        return None
+
+    async def set(self, email: str, data: dict) -> None:
+        """
+        Store user fields in both tiers.
+
+        Parameters:
+        -----------
+        email : str
+            The token subject.
+        data : dict
+            The user fields to cache.
+        """
+        self.local.set(email, data)
+        if redis_client is not None:
+            try:
+                await redis_client.set(self.prefix + email, json.dumps(data), ex=self.ttl)
+            except RedisError as err:
+                logger.warning(f"User cache write failed: {err}")
+
+    async def invalidate(self, email: str) -> None:
+        """
+        Drop a user from both tiers after it was changed.
+
+        Parameters:
+        -----------
+        email : str
+            The token subject.
+        """
+        self.local.delete(email)
+        if redis_client is not None:
+            try:
+                await redis_client.delete(self.prefix + email)
+            except RedisError as err:
+                logger.warning(f"User cache invalidation failed: {err}")
+
+    def clear(self) -> None:
+        self.local.clear()
+        self.local_hits = self.redis_hits = self.misses = 0
+
+    def stats(self) -> dict:
+        """
+        Return hit/miss counters of the cache.
+
+        Returns:
+        --------
+        dict
+            Hits per tier, misses, hit ratio and the local tier size.
+        """
+        hits = self.local_hits + self.redis_hits
+        total = hits + self.misses
+        return {
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "hit_ratio": hits / total if total else 0.0,
+            "local_size": len(self.local),
+        }
+
+
+user_cache = UserCache(
+    maxsize=settings.user_cache_size,
+    local_ttl=settings.user_cache_local_ttl,
+    ttl=settings.user_cache_ttl,
+)
+
+
+class QueryCache:
+    """
+    Redis read-through cache of per-owner query results.
+
+    Keys embed the owner's current generation, a unique token replaced after every
+    committed write to the owner's contacts. Entries of older generations are not
+    read again and simply expire with their TTL. Results are stored as orjson.
+
+    If Redis rejects the new generation, the generation key is deleted instead,
+    which also retires the old entries. If that fails as well, this worker
+    bypasses the cache for the owner for ``ttl`` seconds; other workers may then
+    serve results cached before the write until those entries expire, i.e. for at
+    most ``ttl`` seconds.
+    """
+
+    prefix = "contacts:"
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._bypass = TTLCache(maxsize=10_000, ttl=ttl)
+
+    def _generation_key(self, owner_id: int) -> str:
+        return f"{self.prefix}{owner_id}:gen"
+
+    async def generation(self, owner_id: int) -> Optional[str]:
+        """
+        Return the owner's current generation, creating one if Redis has none.
+
+        Returns:
+        --------
+        str
+            The generation, or None if Redis is not available.
+        """
+        if redis_client is None:
+            return None
+        key = self._generation_key(owner_id)
+        try:
+            generation = await redis_client.get(key)
+            if generation is None:
+                await redis_client.set(key, time.time_ns(), nx=True)
+                generation = await redis_client.get(key)
+        except RedisError as err:
+            self.errors += 1
+            logger.warning(f"Query cache generation lookup failed: {err}")
+            return None
+        return generation.decode() if isinstance(generation, bytes) else generation
+
+    async def get_or_load(self, owner_id: int, name: str, params: tuple, loader: Callable[[], Awaitable[list]]) -> list:
+        """
+        Return the cached result of a query, running ``loader`` on a miss.
+
+        Parameters:
+        -----------
+        owner_id : int
+            Owner the result belongs to.
+        name : str
+            Name of the query.
+        params : tuple
+            JSON-serializable query parameters.
+        loader : Callable
+            Coroutine function that runs the query and returns a list of row mappings.
+
+        Returns:
+        --------
+        list
+            The rows, as dictionaries when they come from the cache.
+        """
+        if self._bypass.get(owner_id):
+            return await loader()
+        generation = await self.generation(owner_id)
+        if generation is None:
+            return await loader()
+        digest = hashlib.sha1(orjson.dumps(params)).hexdigest()
+        key = f"{self.prefix}{owner_id}:{generation}:{name}:{digest}"
+        try:
+            raw = await redis_client.get(key)
+        except RedisError as err:
+            self.errors += 1
+            logger.warning(f"Query cache read failed: {err}")
+            return await loader()
+        if raw is not None:
+            self.hits += 1
+            return orjson.loads(raw)
+        self.misses += 1
+        rows = await loader()
+        try:
+            await redis_client.set(key, orjson.dumps([dict(row) for row in rows]), ex=self.ttl)
+        except RedisError as err:
+            self.errors += 1
+            logger.warning(f"Query cache write failed: {err}")
+        return rows
+
+    async def invalidate(self, owner_id: int) -> None:
+        """
+        Start a new generation for the owner; call after the write is committed.
+        """
+        if redis_client is None:
+            return
+        key = self._generation_key(owner_id)
+        try:
+            await redis_client.set(key, time.time_ns())
+            return
+        except RedisError as err:
+            self.errors += 1
+            logger.warning(f"Query cache invalidation failed: {err}")
+        try:
+            await redis_client.delete(key)
+        except RedisError as err:
+            self.errors += 1
+            self._bypass.set(owner_id, True)
+            logger.warning(f"Query cache bypassed for owner {owner_id}, generation not deleted: {err}")
+
+    def clear(self) -> None:
+        self.hits = self.misses = self.errors = 0
+        self._bypass.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
+
+
+contacts_cache = QueryCache(ttl=settings.contacts_cache_ttl)
+
+
+class RecentWrites:
+    """
+    Remembers for ``ttl`` seconds which users committed a write, so that their
+    reads go to the primary until the replicas caught up (read-your-writes).
+
+    A write is recorded locally right away and published to Redis in the
+    background, so the other workers see it on their next lookup.
+    """
+
+    prefix = "db:written:"
+
+    def __init__(self, ttl: float, maxsize: int = 100_000):
+        self.ttl = ttl
+        self.local = TTLCache(maxsize, ttl)
+        self._tasks = set()
+
+    def mark(self, user_id: int) -> None:
+        """
+        Record a write of ``user_id``; safe to call from synchronous session events.
+        """
+        self.local.set(user_id, True)
+        if redis_client is None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Committed outside of an event loop, e.g. by a synchronous script.
+            return
+        task = loop.create_task(self._publish(user_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _publish(self, user_id: int) -> None:
+        try:
+            await redis_client.set(f"{self.prefix}{user_id}", 1, px=int(self.ttl * 1000))
+        except RedisError as err:
+            logger.warning(f"Recent write publication failed: {err}")
+
+    async def contains(self, user_id: int) -> bool:
+        """
+        Return True if ``user_id`` wrote within the last ``ttl`` seconds.
+        When Redis cannot be asked, the answer is True so reads stay consistent.
+        """
+        if self.local.get(user_id):
+            return True
+        if redis_client is None:
+            return False
+        try:
+            return bool(await redis_client.exists(f"{self.prefix}{user_id}"))
+        except RedisError as err:
+            logger.warning(f"Recent write lookup failed: {err}")
+            return True
+
+    def clear(self) -> None:
+        self.local.clear()
+
+
+recent_writes = RecentWrites(ttl=settings.db_read_your_writes_seconds)
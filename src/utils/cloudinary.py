@@ -1,6 +1,12 @@
+import asyncio
+import urllib.error
+import urllib.request
+
 import cloudinary
 import cloudinary.uploader
+import cloudinary.utils
 from src.config.settings import settings
+from src.utils.storage import StorageBackend
 
 cloudinary.config(
     cloud_name=settings.cloudinary_name,
@@ -8,7 +14,43 @@ cloudinary.config(
     api_secret=settings.cloudinary_api_secret
 )
 
-def upload_image(file):
-    result = cloudinary.uploader.upload(file)
-    return result['secure_url']
 
+class CloudinaryStorage(StorageBackend):
+    """
+    Stores files in Cloudinary, using the key without its extension as public ID.
+
+    The SDK is synchronous, so every call runs in a worker thread.
+    """
+
+    @staticmethod
+    def _public_id(key: str) -> str:
+        return key.rsplit(".", 1)[0]
+
+    async def exists(self, key: str) -> bool:
+        """
+        Check the delivery URL with a HEAD request.
+
+        The Admin API is rate limited per hour, delivery URLs are not. When the
+        answer is unknown the image counts as missing: uploads use
+        ``overwrite=False``, so storing it again is harmless.
+        """
+        request = urllib.request.Request(self.url(key), method="HEAD")
+
+        def head() -> bool:
+            try:
+                with urllib.request.urlopen(request, timeout=5) as response:
+                    return response.status == 200
+            except (urllib.error.URLError, OSError):
+                return False
+
+        return await asyncio.to_thread(head)
+
+    async def save(self, key: str, data: bytes, content_type: str) -> str:
+        result = await asyncio.to_thread(
+            cloudinary.uploader.upload, data, public_id=self._public_id(key), overwrite=False, resource_type="image"
+        )
+        return result['secure_url']
+
+    def url(self, key: str) -> str:
+        public_id, _, extension = key.rpartition(".")
+        return cloudinary.utils.cloudinary_url(public_id, format=extension, secure=True)[0]
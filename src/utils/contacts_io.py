@@ -0,0 +1,138 @@
+import codecs
+import csv
+import io
+import json
+from typing import AsyncIterator, Iterable, Optional, Sequence, Tuple, Union
+
+Record = Tuple[int, Union[dict, ValueError]]
+
+
+class RecordTooLong(ValueError):
+    """
+    A line or record exceeds the allowed length; the rest of the body cannot be parsed.
+    """
+
+
+async def iter_lines(chunks: AsyncIterator[bytes], max_length: Optional[int] = None) -> AsyncIterator[str]:
+    """
+    Decode a stream of UTF-8 byte chunks into lines without buffering the whole body.
+
+    Parameters:
+    -----------
+    chunks : AsyncIterator[bytes]
+        The raw request body, e.g. ``Request.stream()``.
+    max_length : int, optional
+        Longest allowed line in characters; RecordTooLong is raised as soon as
+        a line, complete or not, is longer.
+
+    Returns:
+    --------
+    AsyncIterator[str]
+        Lines without their trailing newline.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    tail = ""
+    line_number = 0
+    async for chunk in chunks:
+        tail += decoder.decode(chunk)
+        *lines, tail = tail.split("\n")
+        for line in lines:
+            line_number += 1
+            _check_length(line, max_length, f"Line {line_number}")
+            yield line.rstrip("\r")
+        _check_length(tail, max_length, f"Line {line_number + 1}")
+    tail += decoder.decode(b"", final=True)
+    if tail:
+        yield tail.rstrip("\r")
+
+
+def _check_length(text: str, max_length: Optional[int], what: str) -> None:
+    if max_length is not None and len(text) > max_length:
+        raise RecordTooLong(f"{what} is longer than {max_length} characters")
+
+
+async def iter_ndjson(chunks: AsyncIterator[bytes], max_length: Optional[int] = None) -> AsyncIterator[Record]:
+    """
+    Parse newline-delimited JSON objects, raising RecordTooLong for a line over ``max_length``.
+
+    Returns:
+    --------
+    AsyncIterator[Record]
+        ``(line number, object)`` pairs, or ``(line number, ValueError)`` for unparsable lines.
+    """
+    line_number = 0
+    async for line in iter_lines(chunks, max_length):
+        line_number += 1
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as err:
+            yield line_number, ValueError(f"Invalid JSON: {err}")
+            continue
+        if not isinstance(record, dict):
+            yield line_number, ValueError("Expected a JSON object")
+            continue
+        yield line_number, record
+
+
+async def iter_csv(chunks: AsyncIterator[bytes], max_length: Optional[int] = None) -> AsyncIterator[Record]:
+    """
+    Parse a CSV body whose first record is the header.
+
+    Quoted fields may span several lines. Empty cells are returned as None.
+    RecordTooLong is raised once a record, e.g. one with an unbalanced quote
+    that swallows the rest of the body, is longer than ``max_length``.
+
+    Returns:
+    --------
+    AsyncIterator[Record]
+        ``(line number, row)`` pairs, or ``(line number, ValueError)`` for malformed rows.
+    """
+    header = None
+    pending = ""
+    line_number = start_line = 0
+    async for line in iter_lines(chunks, max_length):
+        line_number += 1
+        if not pending:
+            start_line = line_number
+        pending += line
+        _check_length(pending, max_length, f"Record starting at line {start_line}")
+        if pending.count('"') % 2:
+            pending += "\n"
+            continue
+        record, pending = next(csv.reader([pending])), ""
+        if not any(cell.strip() for cell in record):
+            continue
+        if header is None:
+            header = [name.strip() for name in record]
+            continue
+        if len(record) != len(header):
+            yield start_line, ValueError(f"Expected {len(header)} fields, got {len(record)}")
+            continue
+        yield start_line, {name: (value if value != "" else None) for name, value in zip(header, record)}
+    if pending:
+        yield start_line, ValueError("Unterminated quoted field")
+
+
+async def encode_ndjson(chunks: AsyncIterator[Iterable]) -> AsyncIterator[bytes]:
+    """
+    Encode chunks of row mappings as newline-delimited JSON, one write per chunk.
+    """
+    async for rows in chunks:
+        yield "".join(json.dumps(dict(row), default=str) + "\n" for row in rows).encode()
+
+
+async def encode_csv(chunks: AsyncIterator[Iterable], fields: Sequence[str]) -> AsyncIterator[bytes]:
+    """
+    Encode chunks of row mappings as CSV, starting with a header of ``fields``.
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction="ignore")
+    writer.writeheader()
+    yield buffer.getvalue().encode()
+    async for rows in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
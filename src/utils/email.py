@@ -1,40 +1,181 @@
-from pathlib import Path
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig
-from fastapi_mail.errors import ConnectionErrors
-from pydantic import BaseModel, EmailStr
-from typing import List
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from email.utils import formataddr
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+import aiosmtplib
+from sqlalchemy.ext.asyncio import async_sessionmaker
 from src.config.settings import settings
+from src.database.db import SessionLocal
+from src.repository import outbox
+
+logger = logging.getLogger(__name__)
+
+
+async def connect_smtp() -> aiosmtplib.SMTP:
+    """
+    Open an authenticated SMTP connection using the mail settings.
+    """
+    smtp = aiosmtplib.SMTP(
+        hostname=settings.mail_server,
+        port=settings.mail_port,
+        use_tls=settings.mail_ssl_tls,
+        start_tls=settings.mail_starttls,
+        validate_certs=settings.mail_validate_certs,
+    )
+    await smtp.connect()
+    if settings.mail_use_credentials:
+        await smtp.login(settings.mail_username, settings.mail_password)
+    return smtp
+
+
+def build_message(recipients: List[str], subject: str, body: str) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = formataddr((settings.mail_from_name, settings.mail_from))
+    message["To"] = ", ".join(recipients)
+    message["Subject"] = subject
+    message.set_content(body, subtype="html")
+    return message
+
+
+class OutboxWorker:
+    """
+    Delivers messages from the email outbox table in the background.
+
+    Each drain claims a batch of due messages and splits it between at most
+    ``concurrency`` SMTP connections, each of which sends its share sequentially.
+    The outcome of the whole batch is then recorded in one session. Failed
+    messages are retried with exponential backoff up to ``max_attempts`` times.
+    """
 
+    def __init__(
+        self,
+        session_maker: async_sessionmaker,
+        connect: Callable[[], Awaitable[aiosmtplib.SMTP]] = connect_smtp,
+        batch_size: int = 50,
+        concurrency: int = 2,
+        poll_interval: float = 5.0,
+        max_attempts: int = 5,
+        backoff: float = 30.0,
+        lease_seconds: float = 300.0,
+    ):
+        self.session_maker = session_maker
+        self.connect = connect
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.lease_seconds = lease_seconds
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
 
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
 
-class EmailSchema(BaseModel):
-    email: List[EmailStr]
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
 
-conf = ConnectionConfig(
-    MAIL_USERNAME=settings.mail_username,
-    MAIL_PASSWORD=settings.mail_password,
-    MAIL_FROM=settings.mail_from,
-    MAIL_PORT=settings.mail_port,
-    MAIL_SERVER="smtp.meta.ua",
-    MAIL_FROM_NAME="Example email",
-    MAIL_STARTTLS=False,
-    MAIL_SSL_TLS=True,
-    USE_CREDENTIALS=True,
-    VALIDATE_CERTS=True,
-    TEMPLATE_FOLDER=Path(__file__).parent / 'templates',
+    def notify(self) -> None:
+        """
+        Wake the worker up after a message was committed to the outbox.
+        """
+        self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                claimed = await self.drain_once()
+            except Exception as err:
+                logger.exception(f"Email outbox drain failed: {err}")
+                claimed = 0
+            if claimed < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+    async def drain_once(self) -> int:
+        """
+        Claim and deliver one batch of due messages.
+
+        Returns:
+        --------
+        int
+            The number of messages claimed.
+        """
+        async with self.session_maker() as session:
+            messages = await outbox.claim_due_emails(session, self.batch_size, self.lease_seconds)
+        if messages:
+            groups = [messages[i::self.concurrency] for i in range(self.concurrency)]
+            results = await asyncio.gather(*(self._deliver(group) for group in groups if group))
+            await self._record([message_id for sent, _ in results for message_id in sent],
+                               [failure for _, failed in results for failure in failed])
+        return len(messages)
+
+    async def _deliver(self, messages: List[dict]) -> Tuple[List[int], List[Tuple[dict, str]]]:
+        """
+        Send ``messages`` over one connection; return the sent IDs and the failed messages with their errors.
+        """
+        sent, failed = [], []
+        smtp = None
+        try:
+            for message in messages:
+                try:
+                    if smtp is None or not smtp.is_connected:
+                        smtp = await self.connect()
+                    await smtp.send_message(build_message(message["recipients"], message["subject"], message["body"]))
+                    sent.append(message["id"])
+                except (aiosmtplib.SMTPException, OSError) as err:
+                    failed.append((message, str(err)))
+        finally:
+            if smtp is not None and smtp.is_connected:
+                try:
+                    await smtp.quit()
+                except aiosmtplib.SMTPException:
+                    smtp.close()
+        return sent, failed
+
+    async def _record(self, sent: List[int], failed: List[Tuple[dict, str]]) -> None:
+        async with self.session_maker() as session:
+            await outbox.mark_sent(session, sent)
+            for message, error in failed:
+                attempts = message["attempts"] + 1
+                retry_at = None
+                if attempts < self.max_attempts:
+                    retry_at = datetime.now() + timedelta(seconds=self.backoff * 2 ** (attempts - 1))
+                logger.warning(f"Email {message['id']} delivery attempt {attempts} failed: {error}")
+                await outbox.mark_failed(session, message["id"], error, retry_at)
+
+
+outbox_worker = OutboxWorker(
+    SessionLocal,
+    batch_size=settings.email_outbox_batch_size,
+    concurrency=settings.email_outbox_concurrency,
+    poll_interval=settings.email_outbox_poll_interval,
+    max_attempts=settings.email_outbox_max_attempts,
+    backoff=settings.email_outbox_backoff,
 )
 
 
+async def run_outbox_worker():
+    """
+    Run the outbox worker as a standalone process: ``python -m src.utils.email``.
+    """
+    outbox_worker.start()
+    await outbox_worker._task
+
 
-async def send_email(email: EmailSchema, subject: str, body: str):
-    try:
-        message = MessageSchema(
-            subject=subject,
-            recipients=email.dict().get("email"),
-            body=body,
-            subtype="html"
-        )
-        fm = FastMail(conf)
-        await fm.send_message(message)
-    except ConnectionErrors as err:
-        print(err)
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run_outbox_worker())
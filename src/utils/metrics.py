@@ -0,0 +1,197 @@
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50)
+
+# [query count, query seconds] of the request being served, None outside of requests.
+_request_db: ContextVar[Optional[list]] = ContextVar("request_db", default=None)
+
+
+class Histogram:
+    """
+    Prometheus-style histogram with fixed buckets, keyed by a tuple of label values.
+
+    Observations only touch one bucket counter; the cumulative counts are built
+    when the histogram is rendered.
+    """
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...], buckets: Tuple[float, ...]):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._series: Dict[tuple, list] = {}
+
+    def observe(self, key: tuple, value: float) -> None:
+        series = self._series.get(key)
+        if series is None:
+            # One counter per bucket, one for +Inf, then the sum.
+            series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for key, series in sorted(self._series.items()):
+            labels = _format_labels(self.labels, key)
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series):
+                cumulative += count
+                yield f'{self.name}_bucket{{{labels}{"," if labels else ""}le="{bound}"}} {cumulative}'
+            yield f"{self.name}_sum{{{labels}}} {series[-1]}"
+            yield f"{self.name}_count{{{labels}}} {cumulative}"
+
+    def clear(self) -> None:
+        self._series.clear()
+
+
+def _format_labels(names: Tuple[str, ...], values: tuple) -> str:
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Metrics:
+    """
+    Request and database metrics of this process.
+
+    Attributes:
+    -----------
+    in_flight : int
+        Number of requests being served right now.
+    histograms : list
+        Histograms to render; other modules may append their own.
+    gauges : dict
+        Callables returning ``{name: value}`` dictionaries that are rendered as
+        gauges, e.g. cache or pool statistics.
+    """
+
+    def __init__(self):
+        self.in_flight = 0
+        self.requests: Dict[tuple, int] = defaultdict(int)
+        self.latency = Histogram("http_request_duration_seconds", "Request latency.",
+                                 ("method", "route"), LATENCY_BUCKETS)
+        self.db_queries = Histogram("http_request_db_queries", "Database queries per request.",
+                                    ("method", "route"), QUERY_COUNT_BUCKETS)
+        self.db_time = Histogram("http_request_db_seconds", "Database time per request.",
+                                 ("method", "route"), LATENCY_BUCKETS)
+        self.histograms = [self.latency, self.db_queries, self.db_time]
+        self.gauges: Dict[str, Callable[[], dict]] = {}
+
+    def record(self, method: str, route: str, status: int, duration: float, queries: int, db_time: float) -> None:
+        key = (method, route)
+        self.requests[(method, route, status)] += 1
+        self.latency.observe(key, duration)
+        self.db_queries.observe(key, queries)
+        self.db_time.observe(key, db_time)
+
+    def render(self) -> str:
+        """
+        Return all metrics in the Prometheus text exposition format.
+        """
+        lines = [
+            "# HELP http_requests_total Finished requests.",
+            "# TYPE http_requests_total counter",
+        ]
+        for key, count in sorted(self.requests.items()):
+            lines.append(f"http_requests_total{{{_format_labels(('method', 'route', 'status'), key)}}} {count}")
+        lines += [
+            "# HELP http_requests_in_flight Requests being served.",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {self.in_flight}",
+        ]
+        for histogram in self.histograms:
+            lines.extend(histogram.render())
+        for prefix, collect in self.gauges.items():
+            for name, value in collect().items():
+                if isinstance(value, (int, float)):
+                    lines.append(f"# TYPE {prefix}_{name} gauge")
+                    lines.append(f"{prefix}_{name} {float(value)}")
+        return "\n".join(lines) + "\n"
+
+    def clear(self) -> None:
+        self.requests.clear()
+        for histogram in self.histograms:
+            histogram.clear()
+
+
+metrics = Metrics()
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording latency, status, in-flight count and database
+    usage of every HTTP request.
+
+    Requests are labelled with the route template (e.g. ``/contacts/{contact_id}``)
+    rather than the raw path, so the number of series stays bounded.
+    """
+
+    def __init__(self, app, registry: Metrics = metrics):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        db = [0, 0.0]
+        token = _request_db.set(db)
+        self.registry.in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            self.registry.in_flight -= 1
+            _request_db.reset(token)
+            route = scope.get("route")
+            self.registry.record(scope["method"], getattr(route, "path", "unmatched"), status,
+                                 duration, db[0], db[1])
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    db = _request_db.get()
+    if db is not None:
+        db[0] += 1
+        db[1] += elapsed
+
+
+def _handle_error(context):
+    if context.connection is not None and context.connection.info.get("query_start"):
+        context.connection.info["query_start"].pop()
+
+
+def instrument_engine(engine) -> None:
+    """
+    Attribute the queries of ``engine`` to the request that issued them.
+    """
+    if isinstance(engine, AsyncEngine):
+        engine = engine.sync_engine
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
@@ -0,0 +1,174 @@
+import contextlib
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Statement fingerprints of the request being served, None outside of requests.
+_request_queries: ContextVar[Optional[Counter]] = ContextVar("request_queries", default=None)
+
+_placeholder_list = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_numbered_param = re.compile(r"\$\d+|%\(\w+\)s|%s|:\w+")
+_string_literal = re.compile(r"'(?:[^']|'')*'")
+_number_literal = re.compile(r"\b\d+(?:\.\d+)?\b")
+_whitespace = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(statement: str) -> str:
+    """
+    Normalize a SQL statement so that executions differing only in their
+    parameters, literals or IN-list length share one fingerprint.
+    """
+    text = _string_literal.sub("?", statement)
+    text = _numbered_param.sub("?", text)
+    text = _number_literal.sub("?", text)
+    text = _placeholder_list.sub("(?, ...)", text)
+    return _whitespace.sub(" ", text).strip()
+
+
+class QueryProfiler:
+    """
+    Logs slow statements and requests that repeat the same statement (N+1 patterns).
+
+    Attributes:
+    -----------
+    slow_threshold : float
+        Statements running at least this many seconds are logged.
+    explain : bool
+        Attach the query plan of slow SELECT statements to the log record.
+    repeat_threshold : int
+        A request running one fingerprint at least this many times is reported.
+    """
+
+    def __init__(self, slow_threshold: float, explain: bool = False, repeat_threshold: int = 5):
+        self.slow_threshold = slow_threshold
+        self.explain = explain
+        self.repeat_threshold = repeat_threshold
+        self.slow_queries = 0
+        self.repeated_queries = 0
+        self._captures: List[list] = []
+
+    def instrument(self, engine) -> None:
+        if isinstance(engine, AsyncEngine):
+            engine = engine.sync_engine
+        if not event.contains(engine, "before_cursor_execute", self._before_cursor_execute):
+            event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+            event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        context._profiler_start = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._profiler_start
+        if conn.info.get("profiler_explaining"):
+            return
+        queries = _request_queries.get()
+        if queries is not None:
+            queries[fingerprint(statement)] += 1
+        for capture in self._captures:
+            capture.append(statement)
+        if elapsed >= self.slow_threshold:
+            self.slow_queries += 1
+            plan = self._explain(conn, statement, parameters) if self.explain and not executemany else None
+            logger.warning(
+                f"Slow query ({elapsed * 1000:.1f} ms): {_whitespace.sub(' ', statement)}"
+                + (f"\n{plan}" if plan else "")
+            )
+
+    def _explain(self, conn, statement: str, parameters) -> Optional[str]:
+        if not statement.lstrip().upper().startswith("SELECT"):
+            return None
+        prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+        conn.info["profiler_explaining"] = True
+        try:
+            rows = conn.exec_driver_sql(prefix + statement, parameters).fetchall()
+        except Exception as err:
+            return f"EXPLAIN failed: {err}"
+        finally:
+            conn.info["profiler_explaining"] = False
+        return "\n".join(" ".join(str(value) for value in row) for row in rows)
+
+    def report(self, label: str, queries: Counter) -> None:
+        """
+        Log every fingerprint the request ran at least ``repeat_threshold`` times.
+        """
+        for statement, count in queries.items():
+            if count >= self.repeat_threshold:
+                self.repeated_queries += 1
+                logger.warning(f"Possible N+1 in {label}: {count} executions of {statement}")
+
+    @contextlib.contextmanager
+    def capture(self):
+        """
+        Collect the statements executed on instrumented engines while the block runs,
+        across threads and event loops (e.g. under ``TestClient``).
+        """
+        statements = []
+        self._captures.append(statements)
+        try:
+            yield statements
+        finally:
+            self._captures.remove(statements)
+
+    def stats(self) -> dict:
+        return {"slow_queries": self.slow_queries, "repeated_queries": self.repeated_queries}
+
+
+query_profiler = QueryProfiler(
+    slow_threshold=settings.slow_query_threshold_ms / 1000,
+    explain=settings.slow_query_explain,
+    repeat_threshold=settings.query_repeat_threshold,
+)
+
+
+class QueryProfilerMiddleware:
+    """
+    Pure ASGI middleware collecting statement fingerprints per request and
+    reporting repeated ones when the request is done.
+    """
+
+    def __init__(self, app, profiler: QueryProfiler = query_profiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        queries = Counter()
+        token = _request_queries.set(queries)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_queries.reset(token)
+            if queries:
+                route = getattr(scope.get("route"), "path", scope["path"])
+                self.profiler.report(f"{scope['method']} {route}", queries)
+
+
+@contextlib.contextmanager
+def assert_max_queries(max_queries: int, profiler: QueryProfiler = query_profiler):
+    """
+    Fail if the block executes more than ``max_queries`` statements.
+
+    Example:
+    --------
+    >>> with assert_max_queries(2):
+    ...     client.get("/contacts/", headers=headers)
+    """
+    with profiler.capture() as statements:
+        yield statements
+    if len(statements) > max_queries:
+        listing = "\n".join(f"  {index}. {fingerprint(statement)}" for index, statement in enumerate(statements, 1))
+        raise AssertionError(f"Expected at most {max_queries} queries, {len(statements)} were executed:\n{listing}")
@@ -0,0 +1,236 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from typing import Dict, Optional, Tuple
+
+from fastapi import Depends, HTTPException, Request, status
+from redis.exceptions import RedisError
+
+from src.config.settings import settings
+from src.database.models import User
+from src.utils import cache
+from src.utils.cache import TTLCache
+from src.utils.metrics import Histogram, metrics
+from src.utils.utils import get_current_user
+
+logger = logging.getLogger(__name__)
+
+DECISION_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.001, 0.01)
+
+
+def parse_limit(value: str) -> Tuple[int, float]:
+    """
+    Parse a limit like ``"10/60"`` into ``(10 requests, 60 seconds)``.
+    """
+    times, _, seconds = value.partition("/")
+    return int(times), float(seconds or 1)
+
+
+class HybridRateLimiter:
+    """
+    Rate limiter deciding locally and synchronizing with Redis in batches.
+
+    Every worker keeps a token bucket per ``(rule, identity)`` that holds up to
+    ``times`` tokens and refills at ``times / seconds`` per second, so decisions
+    never wait for the network. Admitted requests are also counted per fixed
+    window of ``seconds``; every ``sync_interval`` the counts of all keys are
+    added to Redis in one pipeline. Keys whose cluster-wide count reached the
+    limit are blocked locally until their window ends, which bounds the total
+    over all workers to roughly one sync interval of overshoot.
+
+    Without Redis the counts are dropped and only the local buckets apply. When
+    a sync fails, the counts of windows that have not ended are kept for the
+    next attempt, at most ``maxsize`` of them, as are the blocked keys.
+
+    Attributes:
+    -----------
+    limits : dict
+        Rule name to ``(times, seconds)``; the ``"default"`` rule applies to unknown names.
+    sync_interval : float
+        Seconds between Redis synchronizations.
+    """
+
+    prefix = "ratelimit:"
+
+    def __init__(self, limits: Dict[str, str], sync_interval: float = 1.0, maxsize: int = 100_000):
+        self.limits = {name: parse_limit(value) for name, value in limits.items()}
+        self.sync_interval = sync_interval
+        self.maxsize = maxsize
+        self.decision_time = Histogram("rate_limiter_decision_seconds", "Rate limiter decision latency.",
+                                       ("rule",), DECISION_BUCKETS)
+        self.allowed = 0
+        self.rejected = 0
+        self.syncs = 0
+        self.sync_errors = 0
+        self._task: Optional[asyncio.Task] = None
+        self.reset()
+
+    def reset(self) -> None:
+        # (rule, identity) -> [tokens, last refill]
+        self._buckets = TTLCache(self.maxsize, max(seconds for _, seconds in self.limits.values()))
+        # (rule, identity) -> wall clock time until which the cluster quota is exhausted
+        self._blocked: Dict[tuple, float] = {}
+        # (rule, identity, window) -> requests admitted since the last sync
+        self._pending: Dict[tuple, int] = defaultdict(int)
+
+    def rule(self, name: str) -> Tuple[int, float]:
+        return self.limits.get(name) or self.limits["default"]
+
+    def hit(self, name: str, identity: str) -> Optional[float]:
+        """
+        Take one token for ``identity`` under rule ``name``.
+
+        Returns:
+        --------
+        float
+            None if the request is allowed, otherwise the seconds until it may be retried.
+        """
+        start = time.perf_counter()
+        retry_after = self._decide(name, identity)
+        self.decision_time.observe((name,), time.perf_counter() - start)
+        if retry_after is None:
+            self.allowed += 1
+        else:
+            self.rejected += 1
+        return retry_after
+
+    def _decide(self, name: str, identity: str) -> Optional[float]:
+        times, seconds = self.rule(name)
+        key = (name, identity)
+        now = time.time()
+        blocked_until = self._blocked.get(key)
+        if blocked_until is not None:
+            if blocked_until > now:
+                return blocked_until - now
+            del self._blocked[key]
+        monotonic = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = [float(times), monotonic]
+        else:
+            bucket[0] = min(times, bucket[0] + (monotonic - bucket[1]) * times / seconds)
+            bucket[1] = monotonic
+        self._buckets.set(key, bucket)
+        if bucket[0] < 1:
+            return (1 - bucket[0]) * seconds / times
+        bucket[0] -= 1
+        self._pending[(name, identity, int(now // seconds))] += 1
+        return None
+
+    async def sync(self) -> None:
+        """
+        Add the locally admitted counts to Redis and block keys over their cluster quota.
+        """
+        if cache.redis_client is None:
+            self._pending.clear()
+            return
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, defaultdict(int)
+        pipe = cache.redis_client.pipeline(transaction=False)
+        keys = list(pending)
+        for name, identity, window in keys:
+            _, seconds = self.rule(name)
+            redis_key = f"{self.prefix}{name}:{identity}:{window}"
+            pipe.incrby(redis_key, pending[(name, identity, window)])
+            pipe.expire(redis_key, int(seconds * 2) + 1)
+        try:
+            results = await pipe.execute()
+        except RedisError as err:
+            self.sync_errors += 1
+            logger.warning(f"Rate limiter sync failed: {err}")
+            now = time.time()
+            for key, count in pending.items():
+                if self._window_end(key) > now:
+                    self._pending[key] += count
+            if len(self._pending) > self.maxsize:
+                latest = sorted(self._pending, key=self._window_end)[-self.maxsize:]
+                self._pending = defaultdict(int, {key: self._pending[key] for key in latest})
+            return
+        self.syncs += 1
+        now = time.time()
+        self._blocked = {key: until for key, until in self._blocked.items() if until > now}
+        for (name, identity, window), total in zip(keys, results[::2]):
+            times, seconds = self.rule(name)
+            if total >= times:
+                self._blocked[(name, identity)] = (window + 1) * seconds
+        if len(self._blocked) > self.maxsize:
+            self._blocked = dict(sorted(self._blocked.items(), key=lambda item: item[1])[-self.maxsize:])
+
+    def _window_end(self, key: tuple) -> float:
+        name, _, window = key
+        return (window + 1) * self.rule(name)[1]
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            await self.sync()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.sync()
+
+    def stats(self) -> dict:
+        decisions = self.allowed + self.rejected
+        return {
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "reject_ratio": self.rejected / decisions if decisions else 0.0,
+            "syncs": self.syncs,
+            "sync_errors": self.sync_errors,
+            "blocked_keys": len(self._blocked),
+        }
+
+
+rate_limiter = HybridRateLimiter(settings.rate_limits, sync_interval=settings.rate_limit_sync_interval)
+metrics.histograms.append(rate_limiter.decision_time)
+
+
+def _reject(retry_after: float):
+    raise HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many requests",
+        headers={"Retry-After": str(max(int(retry_after + 0.999), 1))},
+    )
+
+
+class RateLimit:
+    """
+    Dependency limiting requests per client address under the rule ``name``.
+    """
+
+    def __init__(self, name: str, limiter: HybridRateLimiter = rate_limiter):
+        self.name = name
+        self.limiter = limiter
+
+    async def __call__(self, request: Request):
+        if not settings.rate_limit_enabled:
+            return
+        identity = request.client.host if request.client else "unknown"
+        retry_after = self.limiter.hit(self.name, identity)
+        if retry_after is not None:
+            _reject(retry_after)
+
+
+class UserRateLimit(RateLimit):
+    """
+    Dependency limiting requests per authenticated user under the rule ``name``.
+    """
+
+    async def __call__(self, current_user: User = Depends(get_current_user)):
+        if not settings.rate_limit_enabled:
+            return
+        retry_after = self.limiter.hit(self.name, str(current_user.id))
+        if retry_after is not None:
+            _reject(retry_after)
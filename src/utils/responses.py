@@ -0,0 +1,99 @@
+import hashlib
+from datetime import date
+from typing import Iterable, Mapping, Optional
+
+import orjson
+from fastapi import Request, Response, status
+from fastapi.responses import JSONResponse
+
+from src.config.settings import settings
+
+try:
+    import msgpack
+except ImportError:  # MessagePack responses are optional
+    msgpack = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+MSGPACK_TYPES = (MSGPACK, "application/x-msgpack", "application/vnd.msgpack")
+
+
+def contact_to_dict(row: Mapping) -> dict:
+    """
+    Convert a contact row mapping into a JSON-ready dictionary.
+    """
+    data = dict(row)
+    birthday = data.get("birthday")
+    if isinstance(birthday, date):
+        data["birthday"] = birthday.isoformat()
+    return data
+
+
+def negotiate_media_type(request: Optional[Request]) -> str:
+    """
+    Pick the response media type of a contacts list from the ``Accept`` header.
+
+    MessagePack is only chosen if the client asks for it explicitly and the
+    optional ``msgpack`` package is installed; everything else gets JSON.
+    """
+    if request is None or msgpack is None:
+        return JSON
+    accept = request.headers.get("accept", "")
+    for item in accept.split(","):
+        media_type, _, params = item.partition(";")
+        if media_type.strip().lower() in MSGPACK_TYPES and params.replace(" ", "") not in ("q=0", "q=0.0"):
+            return MSGPACK
+    return JSON
+
+
+def _msgpack_default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def contacts_response(rows: Iterable[Mapping], headers: Optional[dict] = None,
+                      request: Optional[Request] = None) -> Response:
+    """
+    Serialize contact rows straight into a response.
+
+    The rows come from column-projected queries and already have the shape of
+    ``ContactSchema``, so they skip the route's response model validation.
+    With ``fast_responses`` enabled JSON is encoded with orjson instead of the
+    standard library. Clients accepting MessagePack get it in either mode.
+    """
+    headers = dict(headers or {}, Vary="Accept")
+    media_type = negotiate_media_type(request)
+    if media_type == MSGPACK:
+        content = msgpack.packb([dict(row) for row in rows], default=_msgpack_default)
+        return Response(content, media_type=MSGPACK, headers=headers)
+    if settings.fast_responses:
+        return Response(orjson.dumps([dict(row) for row in rows]), media_type=JSON, headers=headers)
+    return JSONResponse([contact_to_dict(row) for row in rows], headers=headers)
+
+
+def make_etag(request: Request, *parts) -> str:
+    """
+    Build a strong ETag from the request path, its sorted query parameters and ``parts``.
+
+    ``parts`` must pin down everything else the response body depends on, e.g.
+    the owner's contacts version.
+    """
+    query = sorted(request.query_params.multi_items())
+    digest = hashlib.sha256(repr((request.url.path, query, parts)).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    Check ``If-None-Match`` against ``etag`` using the weak comparison RFC 9110 requires for it.
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    return "*" in candidates or any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
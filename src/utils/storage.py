@@ -0,0 +1,74 @@
+import asyncio
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from pathlib import Path
+
+from src.config.settings import settings
+
+
+class StorageBackend(ABC):
+    """
+    Interface of the stores that hold uploaded media.
+
+    Keys are slash-separated paths such as ``avatars/<sha256>/256.webp``.
+    """
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def save(self, key: str, data: bytes, content_type: str) -> str:
+        """
+        Store ``data`` under ``key`` and return its public URL.
+        """
+
+    @abstractmethod
+    def url(self, key: str) -> str:
+        ...
+
+
+class LocalStorage(StorageBackend):
+    """
+    Stores files under a local directory, for development and tests.
+
+    Attributes:
+    -----------
+    root : Path
+        Directory the files are written to.
+    base_url : str
+        URL prefix the directory is served under.
+    """
+
+    def __init__(self, root, base_url: str):
+        self.root = Path(root)
+        self.base_url = base_url.rstrip("/")
+
+    async def exists(self, key: str) -> bool:
+        return await asyncio.to_thread((self.root / key).is_file)
+
+    async def save(self, key: str, data: bytes, content_type: str) -> str:
+        path = self.root / key
+
+        def write():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(path.name + ".tmp")
+            tmp.write_bytes(data)
+            tmp.replace(path)
+
+        await asyncio.to_thread(write)
+        return self.url(key)
+
+    def url(self, key: str) -> str:
+        return f"{self.base_url}/{key}"
+
+
+@lru_cache
+def get_storage() -> StorageBackend:
+    """
+    Return the storage backend selected by ``settings.media_storage``.
+    """
+    if settings.media_storage == "local":
+        return LocalStorage(settings.media_root, settings.media_url)
+    from src.utils.cloudinary import CloudinaryStorage
+    return CloudinaryStorage()
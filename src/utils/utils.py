@@ -3,12 +3,14 @@ from typing import Optional
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.ext.asyncio import AsyncSession
-from src.database.db import get_db
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from src.database.db import get_db, get_session_maker, sessionmanager
+from src.database.models import User
 from src.schemas.schemas import TokenData
 from src.repository import users
 from src.config.settings import settings
-from src.utils.password import verify_password
+from src.utils.cache import recent_writes, user_cache
+from src.utils.password import verify_password_async
 
 SECRET_KEY = settings.secret_key
 ALGORITHM = settings.algorithm
@@ -43,14 +45,25 @@ async def get_current_user(db: AsyncSession = Depends(get_db), token: str = Depe
         token_data = TokenData(email=email)
     except JWTError:
         raise credentials_exception
+    cached = await user_cache.get(token_data.email)
+    if cached is not None:
+        db.info["user_id"] = cached["id"]
+        return User(**cached)
     user = await users.get_user_by_email(db, email=token_data.email)
     if user is None:
         raise credentials_exception
+    db.info["user_id"] = user.id
+    await user_cache.set(token_data.email, {
+        "id": user.id,
+        "email": user.email,
+        "is_verified": user.is_verified,
+        "avatar_url": user.avatar_url,
+    })
     return user
 
 async def authenticate_user(db: AsyncSession, email: str, password: str):
     user = await users.get_user_by_email(db, email)
-    if not user or not verify_password(password, user.hashed_password):
+    if not user or not await verify_password_async(password, user.hashed_password):
         return False
     return user
 
@@ -63,3 +76,16 @@ def decode_token(token: str):
         return email
     except JWTError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+
+async def get_read_db(current_user: User = Depends(get_current_user),
+                      session_maker: async_sessionmaker = Depends(get_session_maker)):
+    """
+    Session for read-only endpoints: served by a read replica, or by the primary
+    while the user's own recent writes may not have been replicated yet.
+
+    Primary sessions come from ``get_session_maker``, so overriding that
+    dependency (tests, benchmarks) also redirects these reads.
+    """
+    primary = bool(sessionmanager.replicas) and await recent_writes.contains(current_user.id)
+    async with sessionmanager.read_session(primary=primary, session_maker=session_maker) as session:
+        yield session
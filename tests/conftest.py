@@ -6,15 +6,22 @@ from sqlalchemy.pool import StaticPool
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from main import app
 from src.database.models import Base, User
-from src.database.db import get_db
+from src.database.db import get_db, get_session_maker
 from src.utils.utils import create_access_token
 from src.utils.password import get_password_hash
+from src.utils.cache import user_cache
+from src.utils.metrics import instrument_engine
+from src.utils.profiler import query_profiler
+from src.utils.rate_limit import rate_limiter
 
 
 SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///./test.db"
 
 engine = create_async_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool)
 
+instrument_engine(engine)
+query_profiler.instrument(engine)
+
 TestingSessionLocal = async_sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 test_user = {"email": "deadpool@example.com", "password": "12345678"}
@@ -22,6 +29,9 @@ test_user = {"email": "deadpool@example.com", "password": "12345678"}
 
 @pytest.fixture(scope="module", autouse=True)
 def init_models_wrap():
+    user_cache.clear()
+    rate_limiter.reset()
+
     async def init_models():
         async with engine.begin() as conn:
             await conn.run_sync(Base.metadata.drop_all)
@@ -48,6 +58,7 @@ def client():
             await session.close()
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_session_maker] = lambda: TestingSessionLocal
 
     yield TestClient(app)
 
@@ -55,4 +66,5 @@ def client():
 @pytest_asyncio.fixture(scope="module")
 def get_token():
     token = create_access_token(data={"sub": test_user["email"]})
-    return token
\ No newline at end of file
+    return token
+
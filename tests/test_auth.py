@@ -1,25 +1,35 @@
+import json
 import pytest
-from unittest.mock import AsyncMock, Mock
+from PIL import Image
 from sqlalchemy import select
-from src.database.models import User
+from src.database.models import User, EmailOutbox
 from src.utils.utils import create_access_token
+from src.utils.cache import user_cache
+from src.utils.password import password_hasher
+from src.config.settings import settings
+from src.utils.avatar import MULTIPART_OVERHEAD, _known_digests
+from src.utils.storage import LocalStorage, get_storage
+from main import app
 from tests.conftest import TestingSessionLocal
 
 user_data = {"username": "agent007", "email": "agent007@gmail.com", "password": "12345678"}
 
 # Тести для реєстрації користувача
-def test_register_user(client, monkeypatch):
-    mock_send_email = AsyncMock()
-    monkeypatch.setattr("src.routes.auth.send_email", mock_send_email)
+@pytest.mark.asyncio
+async def test_register_user(client):
     response = client.post("auth/register", json=user_data)
     assert response.status_code == 201, response.text
     data = response.json()
     assert data["email"] == user_data["email"]
     assert "password" not in data
 
-def test_repeat_register(client, monkeypatch):
-    mock_send_email = AsyncMock()
-    monkeypatch.setattr("src.routes.auth.send_email", mock_send_email)
+    async with TestingSessionLocal() as session:
+        messages = (await session.execute(select(EmailOutbox))).scalars().all()
+    assert len(messages) == 1
+    assert json.loads(messages[0].recipients) == [user_data["email"]]
+    assert messages[0].status == "pending"
+
+def test_repeat_register(client):
     response = client.post("auth/register", json=user_data)
     assert response.status_code == 409, response.text
     data = response.json()
@@ -84,15 +94,82 @@ async def test_verify_email(client):
     data = response.json()
     assert data["message"] == "Email verified successfully"
 
+class CountingStorage(LocalStorage):
+    def __init__(self, root):
+        super().__init__(root, "/media")
+        self.saved = []
+
+    async def save(self, key, data, content_type):
+        self.saved.append(key)
+        return await super().save(key, data, content_type)
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = CountingStorage(tmp_path)
+    _known_digests.clear()
+    app.dependency_overrides[get_storage] = lambda: storage
+    yield storage
+    del app.dependency_overrides[get_storage]
+
 # Тест для завантаження аватара
 @pytest.mark.asyncio
-async def test_upload_avatar(client, monkeypatch):
+async def test_upload_avatar(client, storage):
     token = create_access_token(data={"sub": user_data["email"]})
-    mock_upload_image = Mock(return_value="http://example.com/avatar.png")
-    monkeypatch.setattr("src.routes.auth.upload_image", mock_upload_image)
-    
+
     with open("templates/avatar.png", "rb") as avatar_file:
         response = client.post("auth/upload-avatar", files={"file": avatar_file}, headers={"Authorization": f"Bearer {token}"})
     assert response.status_code == 200, response.text
     data = response.json()
-    assert data["avatar_url"] == "http://example.com/avatar.png"
+    assert data["avatar_url"].startswith("/media/avatars/")
+    assert data["avatar_url"].endswith("/256.webp")
+    assert len(storage.saved) == 3
+    with Image.open(storage.root / storage.saved[-1]) as image:
+        assert image.format == "WEBP"
+
+    # Повторне завантаження того самого зображення не звертається до сховища
+    _known_digests.clear()
+    with open("templates/avatar.png", "rb") as avatar_file:
+        response = client.post("auth/upload-avatar", files={"file": avatar_file}, headers={"Authorization": f"Bearer {token}"})
+    assert response.json()["avatar_url"] == data["avatar_url"]
+    assert len(storage.saved) == 3
+
+# Тест для відхилення завеликих або пошкоджених аватарів
+def test_upload_avatar_rejected(client, storage, monkeypatch):
+    headers = {"Authorization": f"Bearer {create_access_token(data={'sub': user_data['email']})}"}
+    response = client.post("auth/upload-avatar", files={"file": ("a.png", b"not an image")}, headers=headers)
+    assert response.status_code == 400, response.text
+
+    monkeypatch.setattr(settings, "avatar_max_bytes", 1024)
+    with open("templates/avatar.png", "rb") as avatar_file:
+        response = client.post("auth/upload-avatar", files={"file": avatar_file}, headers=headers)
+    assert response.status_code == 413, response.text
+
+    body = b"x" * (settings.avatar_max_bytes + MULTIPART_OVERHEAD + 1)
+    response = client.post("auth/upload-avatar", files={"file": ("big.png", body)}, headers=headers)
+    assert response.status_code == 413, response.text
+    chunked = (body[start:start + 4096] for start in range(0, len(body), 4096))
+    response = client.post("auth/upload-avatar", content=chunked,
+                           headers=dict(headers, **{"Content-Type": "multipart/form-data; boundary=b"}))
+    assert response.status_code == 413, response.text
+    assert storage.saved == []
+
+# Тест для кешу автентифікованих користувачів
+def test_current_user_cache(client):
+    token = create_access_token(data={"sub": user_data["email"]})
+    user_cache.clear()
+    for _ in range(3):
+        response = client.get("auth/users/me", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 200, response.text
+    stats = user_cache.stats()
+    assert stats["misses"] == 1
+    assert stats["local_hits"] == 2
+    assert response.json()["avatar_url"].startswith("/media/avatars/")
+
+# Тест для відмови при переповненій черзі хешування паролів
+def test_login_backpressure(client, monkeypatch):
+    monkeypatch.setattr(password_hasher, "max_queue", 0)
+    response = client.post("auth/login",
+                           data={"username": user_data.get("email"), "password": user_data.get("password")})
+    assert response.status_code == 503, response.text
+    assert response.headers["Retry-After"] == "1"
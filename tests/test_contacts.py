@@ -0,0 +1,427 @@
+import base64
+import csv
+import io
+import json
+import pytest
+from datetime import date, timedelta
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from main import app
+from src.config.settings import settings
+from src.database.db import get_session_maker
+import src.repository.contacts as crud
+from src.utils import cache
+from src.utils.profiler import query_profiler
+from src.utils.utils import create_access_token
+from tests.conftest import TestingSessionLocal
+
+contact_data = {
+    "first_name": "John", "last_name": "Doe", "email": "john.doe@example.com",
+    "phone_number": "1234567890", "birthday": "1990-01-01", "additional_info": "Some info",
+}
+
+
+def auth_headers(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def create_contacts(client, token, count, prefix="page"):
+    last_names = ["Smith", "Adams", "Brown", "Clark", "Young"]
+    for i in range(count):
+        body = dict(contact_data, first_name=f"{prefix}{i}", last_name=last_names[i % len(last_names)],
+                    email=f"{prefix}{i}@example.com")
+        response = client.post("contacts/", json=body, headers=auth_headers(token))
+        assert response.status_code == 201, response.text
+
+
+def test_create_contact(client, get_token):
+    response = client.post("contacts/", json=contact_data, headers=auth_headers(get_token))
+    assert response.status_code == 201, response.text
+    data = response.json()
+    assert data["email"] == contact_data["email"]
+    assert "id" in data
+
+
+def test_read_routes_use_overridden_session_maker(client, get_token, monkeypatch):
+    opened = []
+
+    def session_maker():
+        opened.append(True)
+        return TestingSessionLocal()
+
+    monkeypatch.setitem(app.dependency_overrides, get_session_maker, lambda: session_maker)
+    for url in ("contacts/", "contacts/search/?query=test", "contacts/upcoming-birthdays/"):
+        assert client.get(url, headers=auth_headers(get_token)).status_code == 200
+    assert len(opened) == 3
+
+
+@pytest.mark.parametrize("order_by", ["id", "last_name"])
+def test_cursor_pagination(client, get_token, order_by):
+    if order_by == "id":
+        create_contacts(client, get_token, 6)
+    expected = client.get("contacts/", params={"limit": 100, "order_by": order_by},
+                          headers=auth_headers(get_token)).json()
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, "order_by": order_by}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("contacts/", params=params, headers=auth_headers(get_token))
+        assert response.status_code == 200, response.text
+        seen.extend(contact["id"] for contact in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+    assert seen == [contact["id"] for contact in expected]
+    assert len(seen) == 7
+
+
+def test_offset_pagination_still_works(client, get_token):
+    response = client.get("contacts/", params={"skip": 5, "limit": 10}, headers=auth_headers(get_token))
+    assert response.status_code == 200, response.text
+    assert len(response.json()) == 2
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_invalid_cursor(client, get_token):
+    response = client.get("contacts/", params={"cursor": "garbage"}, headers=auth_headers(get_token))
+    assert response.status_code == 400, response.text
+
+
+def test_cursor_pagination_ties_at_page_boundary(client, get_token):
+    headers = auth_headers(get_token)
+    created = []
+    for i, first_name in enumerate(("b", "a", "a", "c", "a")):
+        body = dict(contact_data, first_name=first_name, last_name="Tie", email=f"tie{i}@example.com")
+        created.append(client.post("contacts/", json=body, headers=headers).json()["id"])
+    expected = client.get("contacts/", params={"limit": 100, "order_by": "last_name"}, headers=headers).json()
+
+    pages, cursor = [], None
+    while True:
+        params = {"limit": 2, "order_by": "last_name", **({"cursor": cursor} if cursor else {})}
+        response = client.get("contacts/", params=params, headers=headers)
+        pages.append(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+    assert [contact["id"] for page in pages for contact in page] == [contact["id"] for contact in expected]
+    assert any(page[-1]["last_name"] == following[0]["last_name"] == "Tie" and
+               page[-1]["first_name"] == following[0]["first_name"] == "a"
+               for page, following in zip(pages, pages[1:]))
+    for contact_id in created:
+        client.delete(f"contacts/{contact_id}", headers=headers)
+
+
+def test_cursor_from_older_ordering_is_rejected(client, get_token):
+    # Cursors issued before first_name joined the last_name ordering held two keys.
+    raw = json.dumps({"o": "last_name", "k": ["Smith", 3]}, separators=(",", ":")).encode()
+    cursor = base64.urlsafe_b64encode(raw).decode().rstrip("=")
+    response = client.get("contacts/", params={"cursor": cursor, "order_by": "last_name"},
+                          headers=auth_headers(get_token))
+    assert response.status_code == 400, response.text
+
+
+@pytest.mark.parametrize("key", [[["x"]], [{"id": 1}], ["1"], [True], [1.5]])
+def test_cursor_with_wrongly_typed_key_is_rejected(client, get_token, key):
+    raw = json.dumps({"o": "id", "k": key}, separators=(",", ":")).encode()
+    cursor = base64.urlsafe_b64encode(raw).decode().rstrip("=")
+    response = client.get("contacts/", params={"cursor": cursor}, headers=auth_headers(get_token))
+    assert response.status_code == 400, response.text
+
+
+@pytest.mark.parametrize("params", [{"limit": 0}, {"limit": -1}, {"limit": 1001}, {"skip": -1}])
+def test_list_bounds(client, get_token, params):
+    response = client.get("contacts/", params=params, headers=auth_headers(get_token))
+    assert response.status_code == 422, response.text
+
+
+def test_search_contacts(client, get_token):
+    headers = auth_headers(get_token)
+    response = client.get("contacts/search/", params={"query": "page"}, headers=headers)
+    assert response.status_code == 200, response.text
+    assert len(response.json()) == 6
+
+    response = client.get("contacts/search/", params={"query": "page", "limit": 2, "skip": 1}, headers=headers)
+    assert len(response.json()) == 2
+
+    response = client.get("contacts/search/", params={"query": "some inf"}, headers=headers)
+    assert len(response.json()) == 7
+
+
+def test_search_follows_updates_and_deletes(client, get_token):
+    headers = auth_headers(get_token)
+    contact = client.get("contacts/search/", params={"query": "page0@"}, headers=headers).json()[0]
+    body = dict(contact_data, first_name="Zebulon", email="zebulon@example.com")
+    assert client.put(f"contacts/{contact['id']}", json=body, headers=headers).status_code == 200
+    assert client.get("contacts/search/", params={"query": "page0@"}, headers=headers).json() == []
+    assert [c["id"] for c in client.get("contacts/search/", params={"query": "zebul"}, headers=headers).json()] == [contact["id"]]
+
+    assert client.delete(f"contacts/{contact['id']}", headers=headers).status_code == 200
+    assert client.get("contacts/search/", params={"query": "zebul"}, headers=headers).json() == []
+
+
+def test_upcoming_birthdays_wrap_years(client, get_token):
+    headers = auth_headers(get_token)
+    today = date.today()
+    soon = today + timedelta(days=3)
+    body = dict(contact_data, first_name="Birthday", email="birthday@example.com",
+                birthday=date(1985, soon.month, min(soon.day, 28)).isoformat())
+    created = client.post("contacts/", json=body, headers=headers).json()
+
+    response = client.get("contacts/upcoming-birthdays/", params={"days": 7}, headers=headers)
+    assert response.status_code == 200, response.text
+    assert created["id"] in [contact["id"] for contact in response.json()]
+
+    response = client.get("contacts/upcoming-birthdays/", params={"days": 365}, headers=headers)
+    assert len(response.json()) == len(client.get("contacts/", params={"limit": 100}, headers=headers).json())
+
+
+def test_import_contacts_csv(client, get_token):
+    body = (
+        "first_name,last_name,email,phone_number,birthday,additional_info\n"
+        "Csv,One,csv1@example.com,111,1991-03-04,\n"
+        "Csv,Two,csv2@example.com,222,1992-05-06,\"multi\nline\"\n"
+        "Csv,Bad,not-an-email,333,1993-07-08,\n"
+        "Csv,Dup,csv1@example.com,444,1994-09-10,\n"
+        "Csv,Short\n"
+    )
+    response = client.post("contacts/import", content=body.encode(),
+                           headers=dict(auth_headers(get_token), **{"Content-Type": "text/csv"}))
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert data["imported"] == 2
+    assert data["failed"] == 3
+    assert sorted(error["row"] for error in data["errors"]) == [5, 6, 7]
+
+    found = client.get("contacts/search/", params={"query": "csv2@"}, headers=auth_headers(get_token)).json()
+    assert found[0]["additional_info"] == "multi\nline"
+    assert found[0]["birthday"] == "1992-05-06"
+
+
+def test_import_contacts_ndjson(client, get_token):
+    lines = [
+        '{"first_name": "Nd", "last_name": "Json", "email": "nd1@example.com", "phone_number": "1", "birthday": "1990-01-02"}',
+        '{"first_name": "Nd"',
+        '[1, 2]',
+        '',
+        '{"first_name": "Nd", "last_name": "Json", "email": "nd2@example.com", "phone_number": "2", "birthday": "1990-01-03"}',
+    ]
+    response = client.post("contacts/import", params={"format": "ndjson"}, content="\n".join(lines).encode(),
+                           headers=auth_headers(get_token))
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert data["imported"] == 2
+    assert [error["row"] for error in data["errors"]] == [2, 3]
+
+
+def test_import_sends_multi_row_inserts(client, get_token, monkeypatch):
+    inserts = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT INTO contacts "):
+            inserts.append((statement.count("?, ?, ?, ?, ?, ?, ?, ?"), executemany))
+
+    # 8 columns per contact: at most 2 rows per statement.
+    monkeypatch.setattr(crud, "MAX_BIND_PARAMETERS", 16)
+    event.listen(Engine, "before_cursor_execute", record)
+    try:
+        lines = [json.dumps(dict(contact_data, email=f"multi{i}@example.com")) for i in range(5)]
+        response = client.post("contacts/import", params={"format": "ndjson"}, content="\n".join(lines).encode(),
+                               headers=auth_headers(get_token))
+    finally:
+        event.remove(Engine, "before_cursor_execute", record)
+    assert response.status_code == 200, response.text
+    assert response.json()["imported"] == 5
+    assert inserts == [(2, False), (2, False), (1, False)]
+
+
+@pytest.mark.parametrize("body, format", [
+    ('{"first_name": "' + "x" * 200 + '"}', "ndjson"),
+    ("first_name,last_name,email,phone_number,birthday,additional_info\n"
+     'Open,Quote,open@example.com,1,1990-01-01,"never closed\n' + "more text\n" * 30, "csv"),
+])
+def test_import_rejects_long_records(client, get_token, monkeypatch, body, format):
+    monkeypatch.setattr(settings, "import_max_record_length", 100)
+    response = client.post("contacts/import", params={"format": format}, content=body.encode(),
+                           headers=auth_headers(get_token))
+    assert response.status_code == 413, response.text
+    assert "longer than 100 characters" in response.json()["detail"]
+
+
+@pytest.mark.parametrize("format", ["ndjson", "csv"])
+def test_export_contacts(client, get_token, format):
+    headers = auth_headers(get_token)
+    expected = client.get("contacts/", params={"limit": 1000}, headers=headers).json()
+    response = client.get("contacts/export", params={"format": format}, headers=headers)
+    assert response.status_code == 200, response.text
+    if format == "ndjson":
+        rows = [json.loads(line) for line in response.text.splitlines()]
+    else:
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [int(row["id"]) for row in rows] == [contact["id"] for contact in expected]
+    assert rows[0]["email"] == expected[0]["email"]
+
+
+@pytest.mark.parametrize("url", ["contacts/", "contacts/search/?query=page", "contacts/upcoming-birthdays/"])
+def test_conditional_get(client, get_token, url):
+    headers = auth_headers(get_token)
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200, response.text
+    etag = response.headers["ETag"]
+
+    response = client.get(url, headers=dict(headers, **{"If-None-Match": etag}))
+    assert response.status_code == 304
+    assert response.content == b""
+
+    created = client.post("contacts/", json=dict(contact_data, email=f"etag{len(url)}@example.com"), headers=headers)
+    response = client.get(url, headers=dict(headers, **{"If-None-Match": etag}))
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    client.delete(f"contacts/{created.json()['id']}", headers=headers)
+
+
+def test_conditional_get_single_contact(client, get_token):
+    headers = auth_headers(get_token)
+    contact_id = client.get("contacts/", headers=headers).json()[0]["id"]
+    etag = client.get(f"contacts/{contact_id}", headers=headers).headers["ETag"]
+    assert client.get(f"contacts/{contact_id}", headers=dict(headers, **{"If-None-Match": etag})).status_code == 304
+    assert client.get("contacts/", headers=dict(headers, **{"If-None-Match": etag})).status_code == 200
+
+
+def test_bulk_update_and_delete(client, get_token):
+    headers = auth_headers(get_token)
+    create_contacts(client, get_token, 3, prefix="bulk")
+    ids = [c["id"] for c in client.get("contacts/search/", params={"query": "bulk"}, headers=headers).json()]
+    body = {"ids": ids + [999999], "changes": {"last_name": "Bulked", "birthday": "1970-06-15"}}
+    response = client.patch("contacts/bulk", json=body, headers=headers)
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert data["processed"] == 3
+    assert data["results"][-1] == {"id": 999999, "status": "not_found"}
+    updated = [client.get(f"contacts/{contact_id}", headers=headers).json() for contact_id in ids]
+    assert {(c["last_name"], c["birthday"]) for c in updated} == {("Bulked", "1970-06-15")}
+    assert updated[0]["first_name"] == "bulk0"
+
+    body = {"ids": ids[:2], "changes": {"email": "same@example.com"}}
+    assert client.patch("contacts/bulk", json=body, headers=headers).status_code == 409
+    assert client.patch("contacts/bulk", json={"ids": ids, "changes": {}}, headers=headers).status_code == 400
+    assert client.patch("contacts/bulk", json={"ids": ids, "changes": {"first_name": None}}, headers=headers).status_code == 422
+
+    response = client.request("DELETE", "contacts/bulk", json={"ids": ids}, headers=headers)
+    assert response.status_code == 200, response.text
+    assert [item["status"] for item in response.json()["results"]] == ["deleted"] * 3
+    assert client.get(f"contacts/{ids[0]}", headers=headers).status_code == 404
+
+
+def test_writes_are_single_statements(client, get_token):
+    headers = auth_headers(get_token)
+    client.get("auth/users/me", headers=headers)
+    body = dict(contact_data, first_name="Single", email="single@example.com")
+    with query_profiler.capture() as statements:
+        created = client.post("contacts/", json=body, headers=headers)
+    assert created.status_code == 201, created.text
+    assert len(statements) == 1 and "RETURNING" in statements[0]
+    contact_id = created.json()["id"]
+
+    with query_profiler.capture() as statements:
+        response = client.put(f"contacts/{contact_id}", json=dict(body, first_name="Updated"), headers=headers)
+    assert response.json()["first_name"] == "Updated"
+    assert len(statements) == 1
+
+    other = client.post("auth/register", json={"email": "intruder@example.com", "password": "12345678"})
+    assert other.status_code == 201, other.text
+    other_headers = auth_headers(create_access_token(data={"sub": "intruder@example.com"}))
+    client.get("auth/users/me", headers=other_headers)
+    with query_profiler.capture() as statements:
+        assert client.put(f"contacts/{contact_id}", json=body, headers=other_headers).status_code == 404
+        assert client.delete(f"contacts/{contact_id}", headers=other_headers).status_code == 404
+    assert len(statements) == 2
+
+    with query_profiler.capture() as statements:
+        response = client.delete(f"contacts/{contact_id}", headers=headers)
+    assert response.json()["first_name"] == "Updated"
+    assert len(statements) == 1
+
+
+@pytest.mark.parametrize("fast", [False, True])
+def test_list_formats(client, get_token, monkeypatch, fast):
+    msgpack = pytest.importorskip("msgpack")
+    monkeypatch.setattr(settings, "fast_responses", fast)
+    headers = auth_headers(get_token)
+    as_json = client.get("contacts/", params={"limit": 100}, headers=headers)
+    assert as_json.headers["content-type"] == "application/json"
+    assert as_json.headers["vary"] == "Accept"
+
+    packed = client.get("contacts/", params={"limit": 100}, headers=dict(headers, Accept="application/msgpack"))
+    assert packed.headers["content-type"] == "application/msgpack"
+    assert msgpack.unpackb(packed.content) == as_json.json()
+    assert packed.headers["ETag"] != as_json.headers["ETag"]
+
+    fallback = client.get("contacts/search/", params={"query": "page"},
+                          headers=dict(headers, Accept="application/msgpack;q=0, application/json"))
+    assert fallback.headers["content-type"] == "application/json"
+
+
+class MemoryRedis:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None, px=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value if isinstance(value, bytes) else str(value).encode()
+        return True
+
+    async def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+
+@pytest.fixture
+def query_cache(monkeypatch):
+    monkeypatch.setattr(cache, "redis_client", MemoryRedis())
+    cache.contacts_cache.clear()
+    yield cache.contacts_cache
+    cache.contacts_cache.clear()
+
+
+@pytest.mark.parametrize("url", ["contacts/?limit=100", "contacts/search/?query=page", "contacts/upcoming-birthdays/?days=365"])
+def test_query_cache_serves_reads_until_write(client, get_token, query_cache, url):
+    headers = auth_headers(get_token)
+    first = client.get(url, headers=headers).json()
+    assert client.get(url, headers=headers).json() == first
+    assert query_cache.stats()["hits"] == 1
+
+    created = client.post("contacts/", json=dict(contact_data, first_name="page-cache", email="cache@example.com"),
+                          headers=headers).json()
+    assert created["id"] in [contact["id"] for contact in client.get(url, headers=headers).json()]
+    assert query_cache.stats()["misses"] == 2
+
+    client.delete(f"contacts/{created['id']}", headers=headers)
+    assert client.get(url, headers=headers).json() == first
+
+
+@pytest.mark.parametrize("delete_fails", [False, True])
+def test_query_cache_failed_invalidation(client, get_token, query_cache, monkeypatch, delete_fails):
+    headers = auth_headers(get_token)
+    url = "contacts/?limit=100"
+    client.get(url, headers=headers)
+
+    async def failing(*args, **kwargs):
+        raise cache.RedisError("unavailable")
+
+    redis = cache.redis_client
+    set_ = redis.set
+    monkeypatch.setattr(redis, "set", failing)
+    if delete_fails:
+        monkeypatch.setattr(redis, "delete", failing)
+    created = client.post("contacts/", json=dict(contact_data, first_name="stale", email="stale@example.com"),
+                          headers=headers).json()
+    monkeypatch.setattr(redis, "set", set_)
+
+    assert created["id"] in [contact["id"] for contact in client.get(url, headers=headers).json()]
+    assert query_cache.stats()["hits"] == 0
+    client.delete(f"contacts/{created['id']}", headers=headers)
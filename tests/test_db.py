@@ -0,0 +1,192 @@
+import os
+import sqlite3
+import subprocess
+import sys
+
+import pytest
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from sqlalchemy import text
+
+from src.database.db import DatabaseSessionManager, InstrumentedQueuePool, create_db_engine, get_pool_stats
+from src.database.models import User
+from src.database.schema import VERSIONS_DIR, check_schema, migration_heads
+from src.repository import users
+from src.schemas.schemas import UserCreate
+from src.utils import utils
+from src.utils.cache import recent_writes
+from src.utils.metrics import _request_db, instrument_engine
+
+
+@pytest.mark.asyncio
+async def test_engine_pool_stats(tmp_path):
+    engine = create_db_engine(f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}")
+    assert isinstance(engine.pool, InstrumentedQueuePool)
+    assert engine.echo is False
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+        assert get_pool_stats(engine)["checked_out"] == 1
+    stats = get_pool_stats(engine)
+    assert stats["checked_out"] == 0
+    assert stats["checkouts"] == 1
+    assert stats["wait_time_max"] >= 0
+    await engine.dispose()
+
+
+def test_memory_database_keeps_default_pool():
+    engine = create_db_engine("sqlite+aiosqlite://")
+    assert not isinstance(engine.pool, InstrumentedQueuePool)
+    assert "status" in get_pool_stats(engine)
+
+
+def test_migration_heads_match_alembic():
+    config = Config()
+    config.set_main_option("script_location", str(VERSIONS_DIR.parent))
+    assert migration_heads() == frozenset(ScriptDirectory.from_config(config).get_heads())
+
+
+@pytest.mark.asyncio
+async def test_check_schema(tmp_path):
+    engine = create_db_engine(f"sqlite+aiosqlite:///{tmp_path / 'schema.db'}")
+    with pytest.raises(RuntimeError, match="revision None"):
+        await check_schema(engine)
+    async with engine.begin() as conn:
+        await conn.execute(text("CREATE TABLE alembic_version (version_num VARCHAR(32) NOT NULL)"))
+        await conn.execute(text("INSERT INTO alembic_version VALUES ('0000')"))
+    with pytest.raises(RuntimeError, match="alembic upgrade head"):
+        await check_schema(engine)
+    head, = migration_heads()
+    async with engine.begin() as conn:
+        await conn.execute(text("UPDATE alembic_version SET version_num = :head"), {"head": head})
+    assert await check_schema(engine) == head
+    await engine.dispose()
+
+
+def test_main_does_not_import_mail_or_cloudinary():
+    code = "import sys, main; print(sorted({'fastapi_mail', 'cloudinary'} & set(sys.modules)))"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert output.strip() == "[]"
+
+
+def test_startup_creates_schema_in_empty_database(tmp_path):
+    database = tmp_path / "empty.db"
+    code = (
+        "from fastapi.testclient import TestClient\n"
+        "import main\n"
+        "with TestClient(main.app) as client:\n"
+        "    body = {'email': 'new@example.com', 'password': '12345678'}\n"
+        "    print(client.post('/auth/register/', json=body).status_code)\n"
+    )
+    env = dict(os.environ, DATABASE_URL=f"sqlite+aiosqlite:///{database}", SCHEMA_STARTUP="create_all")
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, env=env).stdout
+    assert output.splitlines()[-1] == "201"
+    with sqlite3.connect(database) as conn:
+        objects = conn.execute("SELECT type, name FROM sqlite_master").fetchall()
+    tables = {name for kind, name in objects if kind == "table"}
+    assert {"users", "contacts", "contacts_fts", "email_outbox"} <= tables
+    assert any(kind == "trigger" and name.startswith("contacts_version") for kind, name in objects)
+
+
+@pytest.mark.asyncio
+async def test_created_user_is_readable_after_commit(tmp_path):
+    manager = DatabaseSessionManager(f"sqlite+aiosqlite:///{tmp_path / 'users.db'}")
+    async with manager.engine.begin() as conn:
+        await conn.run_sync(User.__table__.create)
+    async with manager.session_maker() as session:
+        user = await users.create_user(session, UserCreate(email="new@example.com", password="12345678"))
+        assert user.email == "new@example.com" and user.id == 1
+    await manager.close()
+
+
+async def make_databases(tmp_path, *names):
+    urls = []
+    for name in names:
+        url = f"sqlite+aiosqlite:///{tmp_path / name}.db"
+        engine = create_db_engine(url)
+        async with engine.begin() as conn:
+            await conn.execute(text("CREATE TABLE origin (name VARCHAR(16))"))
+            await conn.execute(text("INSERT INTO origin VALUES (:name)"), {"name": name})
+        await engine.dispose()
+        urls.append(url)
+    return urls
+
+
+async def origin(session) -> str:
+    return (await session.execute(text("SELECT name FROM origin"))).scalar()
+
+
+@pytest.mark.asyncio
+async def test_read_session_round_robin(tmp_path):
+    primary, *replicas = await make_databases(tmp_path, "primary", "replica1", "replica2")
+    manager = DatabaseSessionManager(primary, replicas)
+    served = []
+    for _ in range(4):
+        async with manager.read_session() as session:
+            served.append(await origin(session))
+    async with manager.read_session(primary=True) as session:
+        served.append(await origin(session))
+    assert served == ["replica1", "replica2", "replica1", "replica2", "primary"]
+    assert manager.replica_stats() == {
+        "replicas": 2, "primary_reads": 1,
+        "replica_0_reads": 2, "replica_0_sessions": 0, "replica_1_reads": 2, "replica_1_sessions": 0,
+    }
+    await manager.close()
+
+
+@pytest.mark.asyncio
+async def test_replica_queries_are_instrumented(tmp_path):
+    primary, replica = await make_databases(tmp_path, "primary", "replica")
+    manager = DatabaseSessionManager(primary, [replica])
+    for db_engine in manager.engines:
+        instrument_engine(db_engine)
+    db = [0, 0.0]
+    token = _request_db.set(db)
+    try:
+        async with manager.read_session() as session:
+            assert await origin(session) == "replica"
+    finally:
+        _request_db.reset(token)
+    assert db[0] == 1
+    stats = manager.replica_pool_stats()
+    assert stats["replica_0_checkouts"] == 1 and stats["replica_0_checked_out"] == 0
+    await manager.close()
+
+
+@pytest.mark.asyncio
+async def test_read_session_least_connections(tmp_path):
+    primary, *replicas = await make_databases(tmp_path, "primary", "replica1", "replica2")
+    manager = DatabaseSessionManager(primary, replicas, replica_selection="least_connections")
+    async with manager.read_session() as busy:
+        busy_origin = await origin(busy)
+        for _ in range(3):
+            async with manager.read_session() as session:
+                assert await origin(session) != busy_origin
+    await manager.close()
+
+
+@pytest.mark.asyncio
+async def test_read_your_writes(tmp_path, monkeypatch):
+    primary, replica = await make_databases(tmp_path, "primary", "replica")
+    manager = DatabaseSessionManager(primary, [replica])
+    monkeypatch.setattr(utils, "sessionmanager", manager)
+    recent_writes.clear()
+    user = User(id=42, email="writer@example.com")
+
+    async def read_origin():
+        dependency = utils.get_read_db(user, manager.session_maker)
+        session = await anext(dependency)
+        try:
+            return await origin(session)
+        finally:
+            await dependency.aclose()
+
+    assert await read_origin() == "replica"
+    async with manager.session_maker() as session:
+        session.info["user_id"] = user.id
+        await session.execute(text("INSERT INTO origin VALUES ('write')"))
+        await session.commit()
+    assert await recent_writes.contains(user.id)
+    assert await read_origin() == "primary"
+    recent_writes.clear()
+    assert await read_origin() == "replica"
+    await manager.close()
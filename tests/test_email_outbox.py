@@ -0,0 +1,86 @@
+import socket
+import pytest
+import aiosmtplib
+from sqlalchemy import select
+
+from src.database.models import EmailOutbox
+from src.repository import outbox
+from src.utils.email import OutboxWorker
+from tests.conftest import TestingSessionLocal
+
+aiosmtpd_controller = pytest.importorskip("aiosmtpd.controller")
+
+
+class RecordingHandler:
+    def __init__(self):
+        self.messages = []
+        self.connections = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.connections += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope)
+        return "250 OK"
+
+
+@pytest.fixture
+def smtp_server():
+    handler = RecordingHandler()
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    controller = aiosmtpd_controller.Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    yield handler, controller.port
+    controller.stop()
+
+
+async def enqueue(count):
+    async with TestingSessionLocal() as session:
+        for i in range(count):
+            await outbox.enqueue_email(session, [f"user{i}@example.com"], f"Subject {i}", "<p>Hello</p>")
+        await session.commit()
+
+
+async def outbox_statuses():
+    async with TestingSessionLocal() as session:
+        return (await session.execute(select(EmailOutbox).order_by(EmailOutbox.id))).scalars().all()
+
+
+@pytest.mark.asyncio
+async def test_worker_reuses_connections(smtp_server):
+    handler, port = smtp_server
+
+    async def connect():
+        smtp = aiosmtplib.SMTP(hostname="127.0.0.1", port=port, use_tls=False, start_tls=False)
+        await smtp.connect()
+        return smtp
+
+    await enqueue(6)
+    worker = OutboxWorker(TestingSessionLocal, connect=connect, batch_size=10, concurrency=2)
+    assert await worker.drain_once() == 6
+    assert await worker.drain_once() == 0
+
+    assert len(handler.messages) == 6
+    assert handler.connections == 2
+    assert all(message.status == "sent" for message in await outbox_statuses())
+
+
+@pytest.mark.asyncio
+async def test_worker_retries_with_backoff():
+    async def connect():
+        raise aiosmtplib.SMTPConnectError("unreachable")
+
+    await enqueue(1)
+    worker = OutboxWorker(TestingSessionLocal, connect=connect, max_attempts=2, backoff=0)
+    assert await worker.drain_once() == 1
+    message = (await outbox_statuses())[-1]
+    assert (message.status, message.attempts) == ("pending", 1)
+
+    assert await worker.drain_once() == 1
+    message = (await outbox_statuses())[-1]
+    assert (message.status, message.attempts) == ("failed", 2)
+    assert "unreachable" in message.last_error
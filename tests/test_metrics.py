@@ -0,0 +1,38 @@
+from src.utils.cache import user_cache
+from src.utils.metrics import Histogram, metrics
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("latency", "Latency.", ("route",), (0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        histogram.observe(("/a",), value)
+    lines = list(histogram.render())
+    assert 'latency_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'latency_bucket{route="/a",le="1.0"} 3' in lines
+    assert 'latency_bucket{route="/a",le="+Inf"} 4' in lines
+    assert 'latency_count{route="/a"} 4' in lines
+
+
+def test_metrics_endpoint(client, get_token):
+    metrics.clear()
+    user_cache.clear()
+    headers = {"Authorization": f"Bearer {get_token}"}
+    client.get("auth/users/me/", headers=headers)
+    client.get("auth/users/me/", headers=headers)
+    client.get("contacts/", headers=headers)
+    client.get("contacts/123456", headers=headers)
+    client.get("no/such/path")
+
+    response = client.get("metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'http_requests_total{method="GET",route="/contacts/{contact_id}",status="404"} 1' in body
+    assert 'http_requests_total{method="GET",route="unmatched",status="404"} 1' in body
+    assert 'http_request_duration_seconds_count{method="GET",route="/contacts/"} 1' in body
+    # The list costs the version lookup and the page query.
+    assert 'http_request_db_queries_sum{method="GET",route="/contacts/"} 2' in body
+    # The second request finds the user in the cache.
+    assert 'http_request_db_queries_bucket{method="GET",route="/auth/users/me/",le="0"} 1' in body
+    assert "http_requests_in_flight 1" in body
+    assert "user_cache_hit_ratio" in body
@@ -0,0 +1,56 @@
+import logging
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.utils.profiler import QueryProfiler, QueryProfilerMiddleware, assert_max_queries, fingerprint
+
+
+def test_fingerprint_ignores_parameters():
+    assert fingerprint("SELECT * FROM contacts WHERE id IN (?, ?, ?) AND name = 'x'") == \
+        fingerprint("SELECT *\n  FROM contacts WHERE id IN (?, ?) AND name = 'other'")
+    assert fingerprint("SELECT * FROM users WHERE id = $1 LIMIT 10") == "SELECT * FROM users WHERE id = ? LIMIT ?"
+
+
+def test_slow_query_log_with_plan(caplog):
+    profiler = QueryProfiler(slow_threshold=0, explain=True)
+    engine = create_engine("sqlite://")
+    profiler.instrument(engine)
+    with engine.connect() as conn, caplog.at_level(logging.WARNING, logger="src.utils.profiler"):
+        conn.execute(text("CREATE TABLE t (id INTEGER PRIMARY KEY)"))
+        conn.execute(text("SELECT * FROM t WHERE id = :id"), {"id": 1})
+    assert profiler.stats()["slow_queries"] == 2
+    select_log = [record.message for record in caplog.records if "SELECT * FROM t" in record.message]
+    assert len(select_log) == 1
+    assert "SEARCH t USING INTEGER PRIMARY KEY" in select_log[0]
+
+
+@pytest.mark.asyncio
+async def test_repeated_queries_are_reported(caplog):
+    profiler = QueryProfiler(slow_threshold=10, repeat_threshold=3)
+    engine = create_async_engine("sqlite+aiosqlite://")
+    profiler.instrument(engine)
+
+    async def app(scope, receive, send):
+        async with engine.connect() as conn:
+            for contact_id in range(4):
+                await conn.execute(text("SELECT :id"), {"id": contact_id})
+            await conn.execute(text("SELECT sqlite_version()"))
+
+    middleware = QueryProfilerMiddleware(app, profiler)
+    with caplog.at_level(logging.WARNING, logger="src.utils.profiler"):
+        await middleware({"type": "http", "method": "GET", "path": "/loop"}, None, None)
+    await engine.dispose()
+    assert profiler.stats()["repeated_queries"] == 1
+    assert "Possible N+1 in GET /loop: 4 executions of SELECT ?" in caplog.text
+
+
+def test_assert_max_queries(client, get_token):
+    headers = {"Authorization": f"Bearer {get_token}"}
+    client.get("auth/users/me/", headers=headers)
+    with assert_max_queries(2):
+        client.get("contacts/", headers=headers)
+    with pytest.raises(AssertionError, match="at most 1 queries, 2 were executed"):
+        with assert_max_queries(1):
+            client.get("contacts/", headers=headers)
@@ -0,0 +1,100 @@
+import pytest
+
+from src.utils import cache
+from src.utils.metrics import metrics
+from src.utils.rate_limit import HybridRateLimiter, rate_limiter
+
+
+class MemoryPipeline:
+    def __init__(self, data):
+        self.data = data
+        self.commands = []
+
+    def incrby(self, key, amount):
+        self.commands.append((key, amount))
+
+    def expire(self, key, seconds):
+        self.commands.append(None)
+
+    async def execute(self):
+        results = []
+        for command in self.commands:
+            if command is None:
+                results.append(True)
+                continue
+            key, amount = command
+            self.data[key] = self.data.get(key, 0) + amount
+            results.append(self.data[key])
+        return results
+
+
+class MemoryRedis:
+    def __init__(self):
+        self.data = {}
+        self.pipelines = 0
+
+    def pipeline(self, transaction=True):
+        self.pipelines += 1
+        return MemoryPipeline(self.data)
+
+
+def test_local_token_bucket():
+    limiter = HybridRateLimiter({"default": "3/60"})
+    assert [limiter.hit("login", "1.2.3.4") for _ in range(3)] == [None] * 3
+    retry_after = limiter.hit("login", "1.2.3.4")
+    assert 19 < retry_after <= 20
+    assert limiter.hit("login", "5.6.7.8") is None
+    assert limiter.stats()["rejected"] == 1
+
+
+@pytest.mark.asyncio
+async def test_workers_share_quota_through_redis(monkeypatch):
+    redis = MemoryRedis()
+    monkeypatch.setattr(cache, "redis_client", redis)
+    workers = [HybridRateLimiter({"default": "4/60"}) for _ in range(2)]
+    for worker in workers:
+        assert [worker.hit("search", "user") for _ in range(3)] == [None] * 3
+    for worker in workers:
+        await worker.sync()
+    assert redis.pipelines == 2
+    # The second worker saw six admitted requests against a quota of four.
+    assert workers[1].hit("search", "user") is not None
+    # The first one synced before that and learns it with its next batch.
+    assert workers[0].hit("search", "user") is None
+    await workers[0].sync()
+    assert workers[0].hit("search", "user") is not None
+    assert workers[0].hit("search", "other") is None
+
+
+@pytest.mark.asyncio
+async def test_pending_counts_stay_bounded(monkeypatch):
+    limiter = HybridRateLimiter({"default": "100/60"}, maxsize=3)
+    for identity in range(5):
+        limiter.hit("search", str(identity))
+    await limiter.sync()
+    assert len(limiter._pending) == 0
+
+    class FailingPipeline(MemoryPipeline):
+        async def execute(self):
+            raise cache.RedisError("unavailable")
+
+    redis = MemoryRedis()
+    redis.pipeline = lambda transaction=True: FailingPipeline(redis.data)
+    monkeypatch.setattr(cache, "redis_client", redis)
+    for identity in range(5):
+        limiter.hit("search", str(identity))
+    limiter._pending[("search", "old", 0)] += 1
+    await limiter.sync()
+    assert limiter.stats()["sync_errors"] == 1
+    assert len(limiter._pending) == 3
+    assert ("search", "old", 0) not in limiter._pending
+
+
+def test_login_is_rate_limited(client, monkeypatch):
+    monkeypatch.setitem(rate_limiter.limits, "auth.login", (2, 60))
+    data = {"username": "nobody@example.com", "password": "wrong"}
+    assert [client.post("auth/login/", data=data).status_code for _ in range(2)] == [401, 401]
+    response = client.post("auth/login/", data=data)
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) == 30
+    assert 'rate_limiter_decision_seconds_count{rule="auth.login"} 3' in metrics.render()
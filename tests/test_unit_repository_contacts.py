@@ -1,6 +1,7 @@
 import unittest
-from unittest.mock import MagicMock, AsyncMock
+from unittest.mock import MagicMock, AsyncMock, patch
 
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import date, timedelta
 
@@ -8,7 +9,7 @@ from src.database.models import Contact, User
 from src.schemas.schemas import ContactCreate, ContactUpdate
 from src.repository.contacts import (
     get_contacts, create_contact, get_contact, update_contact, delete_contact,
-    search_contacts, get_upcoming_birthdays
+    search_contacts, get_upcoming_birthdays, get_contacts_version, _birthday_key_ranges, _integrity_message
 )
 
 class TestContactRepository(unittest.IsolatedAsyncioTestCase):
@@ -25,7 +26,7 @@ class TestContactRepository(unittest.IsolatedAsyncioTestCase):
     async def test_get_contacts(self):
         contacts = [self.contact]
         mocked_result = MagicMock()
-        mocked_result.scalars.return_value.all.return_value = contacts
+        mocked_result.mappings.return_value.all.return_value = contacts
         self.session.execute.return_value = mocked_result
 
         result = await get_contacts(self.session, skip=0, limit=10, owner_id=self.user.id)
@@ -36,56 +37,70 @@ class TestContactRepository(unittest.IsolatedAsyncioTestCase):
             first_name="Jane", last_name="Doe", email="jane@example.com",
             phone_number="0987654321", birthday=date(1991, 2, 2), additional_info="Other info"
         )
-        self.session.commit.return_value = None
-        self.session.refresh.return_value = self.contact
+        row = dict(contact_create.model_dump(), id=2, owner_id=self.user.id)
+        mocked_result = MagicMock()
+        self.session.execute.return_value = mocked_result
+        mocked_result.mappings.return_value.one.return_value = row
 
         result = await create_contact(self.session, contact_create, owner_id=self.user.id)
-        self.assertIsInstance(result, Contact)
-        self.assertEqual(result.first_name, contact_create.first_name)
-        self.assertEqual(result.last_name, contact_create.last_name)
+        self.assertEqual(result, row)
+        self.assertEqual(self.session.execute.await_count, 1)
+        self.session.commit.assert_awaited_once()
+        self.session.refresh.assert_not_called()
 
     async def test_get_contact(self):
         mocked_result = MagicMock()
         mocked_result.scalars.return_value.first.return_value = self.contact
         self.session.execute.return_value = mocked_result
 
-        result = await get_contact(self.session, contact_id=1)
+        result = await get_contact(self.session, contact_id=1, owner_id=self.user.id)
         self.assertEqual(result, self.contact)
+        statement = self.session.execute.await_args.args[0]
+        self.assertIn("contacts.owner_id", str(statement))
 
     async def test_update_contact(self):
         contact_update = ContactUpdate(
             first_name="Johnny", last_name="Doe", email="johnny@example.com",
             phone_number="1234567890", birthday=date(1990, 1, 1), additional_info="Updated info"
         )
-        self.session.commit.return_value = None
-        self.session.refresh.return_value = self.contact
-
+        row = dict(contact_update.model_dump(), id=1, owner_id=self.user.id)
         mocked_result = MagicMock()
-        mocked_result.scalars.return_value.first.return_value = self.contact
         self.session.execute.return_value = mocked_result
+        mocked_result.mappings.return_value.first.return_value = row
 
         result = await update_contact(self.session, contact_id=1, contact=contact_update, owner_id=self.user.id)
-        self.assertIsInstance(result, Contact)
-        self.assertEqual(result.first_name, contact_update.first_name)
-        self.assertEqual(result.last_name, contact_update.last_name)
+        self.assertEqual(result["first_name"], contact_update.first_name)
+        self.assertEqual(result["last_name"], contact_update.last_name)
+        self.assertEqual(self.session.execute.await_count, 1)
+        self.session.refresh.assert_not_called()
 
-    async def test_delete_contact(self):
-        self.session.commit.return_value = None
+    async def test_update_contact_not_owned(self):
+        contact_update = ContactUpdate(
+            first_name="Johnny", last_name="Doe", email="johnny@example.com",
+            phone_number="1234567890", birthday=date(1990, 1, 1)
+        )
+        mocked_result = MagicMock()
+        self.session.execute.return_value = mocked_result
+        mocked_result.mappings.return_value.first.return_value = None
 
-        self.session.execute.return_value.scalars.return_value.first.return_value = self.contact
+        result = await update_contact(self.session, contact_id=1, contact=contact_update, owner_id=2)
+        self.assertIsNone(result)
 
+    async def test_delete_contact(self):
+        row = {"id": 1, "first_name": "John", "owner_id": self.user.id}
         mocked_result = MagicMock()
-        mocked_result.scalars.return_value.first.return_value = self.contact
         self.session.execute.return_value = mocked_result
+        mocked_result.mappings.return_value.first.return_value = row
 
         result = await delete_contact(self.session, contact_id=1, owner_id=self.user.id)
-        self.session.delete.assert_called_once_with(self.contact)
-        self.assertEqual(result, self.contact)
+        self.session.delete.assert_not_called()
+        self.assertEqual(self.session.execute.await_count, 1)
+        self.assertEqual(result, row)
 
     async def test_search_contacts(self):
         contacts = [self.contact]
         mocked_result = MagicMock()
-        mocked_result.scalars.return_value.all.return_value = contacts
+        mocked_result.mappings.return_value.all.return_value = contacts
         self.session.execute.return_value = mocked_result
 
         result = await search_contacts(self.session, query="John", owner_id=self.user.id)
@@ -94,11 +109,47 @@ class TestContactRepository(unittest.IsolatedAsyncioTestCase):
     async def test_get_upcoming_birthdays(self):
         contacts = [self.contact]
         mocked_result = MagicMock()
-        mocked_result.scalars.return_value.all.return_value = contacts
+        mocked_result.mappings.return_value.all.return_value = contacts
         self.session.execute.return_value = mocked_result
 
         result = await get_upcoming_birthdays(self.session, owner_id=self.user.id)
         self.assertEqual(result, contacts)
 
+    async def test_get_contacts_version(self):
+        mocked_result = MagicMock()
+        mocked_result.scalar.return_value = 3
+        self.session.execute.return_value = mocked_result
+
+        with patch("src.repository.contacts.contacts_cache.generation", AsyncMock(return_value=None)):
+            self.assertEqual(await get_contacts_version(self.session, owner_id=self.user.id), "v3")
+        with patch("src.repository.contacts.contacts_cache.generation", AsyncMock(return_value="abc")):
+            self.assertEqual(await get_contacts_version(self.session, owner_id=self.user.id), "gabc")
+        self.assertEqual(self.session.execute.await_count, 1)
+
+    def test_birthday_key_ranges(self):
+        self.assertEqual(_birthday_key_ranges(date(2024, 6, 10), 7), [(610, 617)])
+        self.assertEqual(_birthday_key_ranges(date(2024, 12, 28), 7), [(1228, 1231), (101, 104)])
+        self.assertEqual(_birthday_key_ranges(date(2025, 2, 21), 7), [(221, 229)])
+        self.assertEqual(_birthday_key_ranges(date(2024, 2, 21), 7), [(221, 228)])
+        self.assertEqual(_birthday_key_ranges(date(2024, 6, 10), 400), [(101, 1231)])
+
+    def test_contact_birthday_key(self):
+        self.assertEqual(self.contact.birthday_key, 101)
+        self.contact.birthday = date(1990, 12, 31)
+        self.assertEqual(self.contact.birthday_key, 1231)
+
+    def test_integrity_message(self):
+        def error(message):
+            return IntegrityError("INSERT", {}, Exception(message))
+
+        self.assertEqual(_integrity_message(error("UNIQUE constraint failed: contacts.email")),
+                         "Contact with this email already exists")
+        self.assertEqual(_integrity_message(error('duplicate key value violates unique constraint '
+                                                  '"contacts_owner_id_email_key"\nDETAIL: ...')),
+                         "Contact with this email already exists")
+        self.assertEqual(_integrity_message(error("FOREIGN KEY constraint failed")), "Owner does not exist")
+        self.assertEqual(_integrity_message(error("NOT NULL constraint failed: contacts.first_name")),
+                         "Constraint violated: NOT NULL constraint failed: contacts.first_name")
+
 if __name__ == "__main__":
     unittest.main()